@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from util.artifact import save_model, load_model
+from util.linear import PolynomialRegression
+
+
+def test_predict_batch_fills_missing_features(tmp_path):
+    rng = np.random.default_rng(24)
+    X = pd.DataFrame({
+        'square_feet' : rng.uniform(500, 4000, 200),
+        'bedroom_count' : rng.integers(1, 6, 200).astype(float)
+    })
+    y = 150 * X.square_feet + 10_000 * X.bedroom_count + rng.normal(0, 1000, 200)
+
+    model = PolynomialRegression(['square_feet', 'bedroom_count'], degree = 2).fit(X, y)
+
+    path = tmp_path / 'model.npz'
+    save_model(path, model, imputer = {'calculatedfinishedsquarefeet' : 1800.0})
+    artifact = load_model(path)
+
+    missing = artifact.predict_batch({'square_feet' : np.nan, 'bedroom_count' : 3.0})
+    filled = artifact.predict_batch({'square_feet' : 1800.0, 'bedroom_count' : 3.0})
+
+    assert not np.isnan(missing).any()
+    np.testing.assert_allclose(missing, filled)
@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+
+from util.evaluate import evaluate_models, regression_metrics
+
+
+def test_mean_prediction_is_not_better_than_baseline():
+    rng = np.random.default_rng(0)
+    actual = pd.Series(rng.normal(450_000, 200_000, 10_001))
+    predictions = pd.DataFrame({
+        'mean' : np.full(len(actual), actual.mean()),
+        'model' : actual + rng.normal(0, 50_000, len(actual))
+    })
+
+    results = evaluate_models(actual, predictions)
+
+    assert results.better_than_baseline.tolist() == [False, False, True]
+    np.testing.assert_allclose(results.loc['model', 'SSE'], regression_metrics(actual, predictions.model).SSE)
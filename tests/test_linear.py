@@ -0,0 +1,36 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from util.linear import PolynomialRegression
+
+
+def test_float32_is_kept_with_a_constant_column_and_a_dummy():
+    rng = np.random.default_rng(24)
+    X = pd.DataFrame({
+        'square_feet' : rng.normal(1800, 600, 2000),
+        'constant' : np.full(2000, 3.0),
+        'dummy' : rng.integers(0, 2, 2000).astype(float)
+    })
+    y = 150 * X.square_feet + 0.02 * X.square_feet ** 2 + 50_000 * X.dummy + rng.normal(0, 1000, 2000)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        model = PolynomialRegression(list(X.columns), degree = 2, dtype = np.float32).fit(X, y)
+
+    assert model.dtype == np.float32
+    assert np.isfinite(model.condition_number) and model.condition_number < model.max_condition
+
+
+def test_float32_falls_back_on_nearly_collinear_features():
+    rng = np.random.default_rng(24)
+    square_feet = rng.normal(1800, 600, 2000)
+    X = pd.DataFrame({'square_feet' : square_feet, 'living_area' : square_feet + rng.normal(0, 1, 2000)})
+    y = 150 * square_feet + rng.normal(0, 1000, 2000)
+
+    with pytest.warns(UserWarning, match = 'refitting in float64'):
+        model = PolynomialRegression(list(X.columns), degree = 1, dtype = np.float32).fit(X, y)
+
+    assert model.dtype == np.float64
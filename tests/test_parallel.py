@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from util.parallel import n_workers, worker_pool, worker_data
+
+
+def test_n_workers_counts_back_from_the_cores():
+    cores = os.cpu_count() or 1
+
+    assert n_workers(None) == 1
+    assert n_workers(3) == 3
+    assert n_workers(-1) == cores
+    assert n_workers(-cores - 5) == 1
+
+    with pytest.raises(ValueError):
+        n_workers(0)
+
+
+@pytest.mark.parametrize('threads', [False, True])
+def test_worker_pool_accepts_all_cores(threads):
+    with worker_pool(-1, threads = threads) as map_batches:
+        assert list(map_batches(pow, [2, 3], [2, 2])) == [4, 9]
+
+
+def test_thread_pool_shares_the_data_and_restores_it():
+    with worker_pool(1, outer = 1):
+        with worker_pool(2, threads = True, values = [1, 2, 3]) as map_batches:
+            assert list(map_batches(lambda i: worker_data()['values'][i], range(3))) == [1, 2, 3]
+
+        assert worker_data() == {'outer' : 1}
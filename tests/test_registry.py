@@ -0,0 +1,26 @@
+import numpy as np
+
+from util.registry import ReportStore
+
+
+def test_diff_of_a_run_with_itself_is_zero(tmp_path):
+    store = ReportStore(str(tmp_path / 'reports.db'))
+    run = store.new_run()
+    other = store.new_run()
+
+    actual = np.array([100.0, 200.0, 300.0])
+    store.score(run, 'Baseline', 'test', actual, np.full(3, 200.0))
+    store.score(run, 'Model_1', 'test', actual, actual + 10)
+    store.score(other, 'Model_1', 'test', actual, actual + 5)
+
+    diff = store.diff(run, run)
+
+    assert list(diff.columns) == [f'{run}_run', f'{run}_other', 'change', 'relative_change']
+    assert list(diff.index) == [('Baseline', 'test'), ('Model_1', 'test')]
+    assert (diff.change == 0).all()
+    assert (diff.relative_change == 0).all()
+
+    diff = store.diff(run, other)
+
+    assert diff.loc[('Model_1', 'test'), 'change'] == -5.0
+    assert np.isnan(diff.loc[('Baseline', 'test'), other])
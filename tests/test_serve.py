@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from util.artifact import save_model, load_model
+from util.linear import PolynomialRegression
+from util.prepare import prepare_zillow_records, get_fill_values
+from util.serve import start_server
+
+
+def _raw_records(n):
+    rng = np.random.default_rng(24)
+    return pd.DataFrame({
+        'bedroomcnt' : rng.integers(1, 6, n).astype(float),
+        'bathroomcnt' : rng.integers(1, 4, n).astype(float),
+        'calculatedfinishedsquarefeet' : rng.uniform(500, 4000, n),
+        'yearbuilt' : rng.integers(1900, 2016, n).astype(float),
+        'fips' : rng.choice([6037.0, 6059.0, 6111.0], n),
+        'fireplacecnt' : rng.choice([np.nan, 1.0], n),
+        'hashottuborspa' : rng.choice([np.nan, 1.0], n),
+        'poolcnt' : rng.choice([np.nan, 1.0], n),
+        'buildingqualitytypeid' : rng.choice([np.nan, 4.0, 7.0], n),
+        'lotsizesquarefeet' : rng.uniform(2000, 12000, n)
+    })
+
+
+async def _request(port, start_line, payload = None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{start_line}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+
+    status = (await reader.readline()).decode()
+    response = await reader.read()
+    writer.close()
+
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def test_server_predictions_match_the_artifact(tmp_path):
+    raw = _raw_records(300)
+    fill_values = get_fill_values(raw)
+    features = ['square_feet', 'bedroom_count', 'building_quality', 'property_age']
+
+    prepared = prepare_zillow_records(raw, fill_values)
+    y = 150 * prepared.square_feet + 10_000 * prepared.bedroom_count + 5_000 * prepared.building_quality
+    model = PolynomialRegression(features, degree = 2).fit(prepared, y)
+
+    path = tmp_path / 'model.npz'
+    save_model(path, model, imputer = fill_values)
+    artifact = load_model(path)
+
+    records = [
+        {'bedroomcnt' : 3.0, 'bathroomcnt' : 2.0, 'calculatedfinishedsquarefeet' : 1800.0, 'yearbuilt' : 1985.0,
+         'fips' : 6037.0, 'fireplacecnt' : None, 'hashottuborspa' : None, 'poolcnt' : 1.0,
+         'buildingqualitytypeid' : 6.0, 'lotsizesquarefeet' : 7000.0},
+        {'bedroomcnt' : 4.0, 'bathroomcnt' : 3.0, 'calculatedfinishedsquarefeet' : None, 'yearbuilt' : 2001.0,
+         'fips' : 6059.0, 'fireplacecnt' : 1.0, 'hashottuborspa' : None, 'poolcnt' : None,
+         'buildingqualitytypeid' : None, 'lotsizesquarefeet' : 9000.0}
+    ]
+    expected = artifact.predict_batch(prepare_zillow_records(pd.DataFrame.from_records(records), artifact.imputer))
+
+    async def run():
+        server, batcher_task = await start_server(artifact, port = 0)
+        port = server.sockets[0].getsockname()[1]
+
+        try:
+            predicted = await _request(port, 'POST /predict HTTP/1.1', records)
+            malformed = await _request(port, 'GARBAGE')
+        finally:
+            batcher_task.cancel()
+            server.close()
+            await server.wait_closed()
+
+        return predicted, malformed
+
+    (status, payload), (malformed_status, _) = asyncio.run(run())
+
+    assert status.startswith('HTTP/1.1 200')
+    np.testing.assert_allclose(payload['predictions'], expected)
+    np.testing.assert_allclose(expected[0], 150 * 1800 + 10_000 * 3 + 5_000 * 6, rtol = 0.01)
+    assert malformed_status.startswith('HTTP/1.1 400')
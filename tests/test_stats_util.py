@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from util.stats_util import run_hypothesis_tests
+
+
+def _frame():
+    rng = np.random.default_rng(24)
+    return pd.DataFrame({'value' : rng.normal(size = 300), 'group' : rng.integers(0, 3, 300)})
+
+
+def test_ttest_on_more_than_two_levels_names_the_column():
+    with pytest.raises(ValueError, match = "'group'"):
+        run_hypothesis_tests(_frame(), [{'test' : 'ttest', 'value' : 'value', 'group' : 'group'}])
+
+
+def test_default_names_include_groups():
+    results = run_hypothesis_tests(_frame(), [
+        {'test' : 'ttest', 'value' : 'value', 'group' : 'group', 'groups' : [0, 1]},
+        {'test' : 'ttest', 'value' : 'value', 'group' : 'group', 'groups' : [0, 2], 'permutation' : True, 'n_permutations' : 500}
+    ])
+
+    assert results.name.nunique() == 2
+    assert results.method.tolist() == ['ttest_ind', 'permutation']
@@ -111,7 +111,9 @@ def _get_zillow_sql():
             buildingqualitytypeid,
             finishedfloor1squarefeet,
             finishedsquarefeet15,
-            lotsizesquarefeet 
+            lotsizesquarefeet,
+            latitude,
+            longitude
         FROM properties_2017
         JOIN propertylandusetype
             ON propertylandusetype.propertylandusetypeid = properties_2017.propertylandusetypeid
@@ -0,0 +1,277 @@
+################################################################################
+#
+#
+#
+#       artifact.py
+#
+#       Description: This file contains functions for saving fitted regression
+#           models to a compact .npz artifact and loading them back for
+#           prediction. Loading an artifact only needs numpy.
+#
+#       Variables:
+#
+#           _format_version
+#
+#       Classes:
+#
+#           ModelArtifact
+#
+#       Functions:
+#
+#           save_model(path, model, imputer, scaler, fingerprint)
+#           load_model(path)
+#           data_fingerprint(X, y)
+#
+#
+################################################################################
+
+import hashlib
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from util.linear import PolynomialRegression, polynomial_powers, terms_from_powers, \
+    expand_polynomial, predict_linear
+
+################################################################################
+
+_format_version = 1
+
+################################################################################
+
+@dataclass
+class ModelArtifact:
+    '''
+        A fitted polynomial regression model loaded from an artifact.
+
+        Attributes
+        ----------
+        features: list[str]
+            The feature columns used by the model, in order.
+
+        powers: ndarray
+            The power of each feature in each polynomial term.
+
+        coef: ndarray
+            The fitted coefficients, one for each polynomial term.
+
+        intercept: float
+            The fitted intercept.
+
+        imputer: dict[str, float]
+            The value used to fill missing values in each column, keyed as
+            given to save_model. This may include unprepared zillow columns
+            as well as model features, and is what prepare_zillow_records
+            takes.
+
+        prepared_imputer: dict[str, float]
+            The fill values of the unprepared zillow columns under their
+            prepared names, used by transform for features that are missing
+            after preparation.
+
+        scaler: dict[str, tuple[float, float]]
+            The (min, scale) pair of a MinMaxScaler for each scaled column.
+
+        fingerprint: str
+            The fingerprint of the training data.
+    '''
+
+    features: list[str]
+    powers: np.ndarray
+    coef: np.ndarray
+    intercept: float
+    imputer: dict[str, float] = field(default_factory = dict)
+    prepared_imputer: dict[str, float] = field(default_factory = dict)
+    scaler: dict[str, tuple[float, float]] = field(default_factory = dict)
+    fingerprint: str = ''
+
+    def __post_init__(self):
+        self._terms = terms_from_powers(self.powers)
+        self._fills = {**self.imputer, **self.prepared_imputer}
+
+    def transform(self, X) -> np.ndarray:
+        '''
+            Return the model's features from X as a float matrix with the
+            missing values filled and the scaled columns scaled.
+
+            Parameters
+            ----------
+            X: DataFrame | dict
+                The records to transform. A dict should map each feature to
+                a value or an array of values.
+        '''
+
+        if isinstance(X, dict):
+            X = pd.DataFrame({feature : np.atleast_1d(X[feature]) for feature in self.features})
+
+        X = np.array(X[self.features], dtype = np.float64)
+
+        for j, feature in enumerate(self.features):
+            if feature in self._fills:
+                missing = np.isnan(X[:, j])
+                X[missing, j] = self._fills[feature]
+
+            if feature in self.scaler:
+                minimum, scale = self.scaler[feature]
+                X[:, j] = X[:, j] * scale + minimum
+
+        return X
+
+    def predict_batch(self, X) -> np.ndarray:
+        '''
+            Return the model's predictions for a batch of records.
+
+            Parameters
+            ----------
+            X: DataFrame | dict
+                The records to predict. A dict should map each feature to a
+                value or an array of values.
+
+            Returns
+            -------
+            ndarray: The predictions.
+        '''
+
+        return predict_linear(expand_polynomial(self.transform(X), self._terms), self.coef, self.intercept)
+
+################################################################################
+
+def save_model(
+    path: str,
+    model: PolynomialRegression,
+    imputer: dict[str, float] = None,
+    scaler = None,
+    fingerprint: str = ''
+) -> None:
+    '''
+        Save a fitted model to an uncompressed .npz artifact.
+
+        Parameters
+        ----------
+        path: str
+            The path of the artifact file.
+
+        model: PolynomialRegression
+            A fitted model.
+
+        imputer: dict[str, float], default None
+            The value used to fill missing values in each column, such as
+            the fill values from util.prepare.get_fill_values. The fills of
+            raw zillow columns are also saved separately under their
+            prepared names.
+
+        scaler: MinMaxScaler | dict[str, tuple[float, float]], default None
+            A fitted MinMaxScaler, or a mapping of each scaled feature to its
+            (min, scale) pair. A MinMaxScaler must have been fit on a
+            DataFrame so that it knows its column names.
+
+        fingerprint: str, default ''
+            The fingerprint of the training data from data_fingerprint.
+    '''
+
+    # The imputer is keyed by raw zillow columns for prepare_zillow_records,
+    # while transform looks up the prepared feature names. They are kept
+    # apart so that preparing records does not add prepared columns twice.
+    # util.prepare is imported here so loading an artifact stays numpy only.
+    from util.prepare import _column_names
+
+    imputer = dict(imputer or {})
+    prepared_imputer = {_column_names[column] : value for column, value in imputer.items() if column in _column_names}
+
+    if scaler is None:
+        scaler = {}
+    elif not isinstance(scaler, dict):
+        scaler = {
+            column : (minimum, scale)
+            for column, minimum, scale in zip(scaler.feature_names_in_, scaler.min_, scaler.scale_)
+        }
+
+    scaler = {column : value for column, value in scaler.items() if column in model.features}
+
+    # Fold the model's own input scaling into the saved scaler
+    for column, (model_min, model_scale) in (model.input_scaler or {}).items():
+        minimum, scale = scaler.get(column, (0.0, 1.0))
+        scaler[column] = (minimum * model_scale + model_min, scale * model_scale)
+
+    np.savez(
+        path,
+        format_version = np.array(_format_version),
+        features = np.array(model.features, dtype = str),
+        powers = polynomial_powers(model.terms, len(model.features)),
+        coef = np.asarray(model.coef, dtype = np.float64),
+        intercept = np.array(model.intercept, dtype = np.float64),
+        imputer_columns = np.array(list(imputer), dtype = str),
+        imputer_values = np.array(list(imputer.values()), dtype = np.float64),
+        prepared_imputer_columns = np.array(list(prepared_imputer), dtype = str),
+        prepared_imputer_values = np.array(list(prepared_imputer.values()), dtype = np.float64),
+        scaler_columns = np.array(list(scaler), dtype = str),
+        scaler_values = np.array(list(scaler.values()), dtype = np.float64).reshape(-1, 2),
+        fingerprint = np.array(fingerprint, dtype = str)
+    )
+
+################################################################################
+
+def load_model(path: str) -> ModelArtifact:
+    '''
+        Load a model artifact saved with save_model.
+
+        Parameters
+        ----------
+        path: str
+            The path of the artifact file.
+
+        Returns
+        -------
+        ModelArtifact: The loaded model.
+    '''
+
+    with np.load(path, allow_pickle = False) as artifact:
+        if int(artifact['format_version']) != _format_version:
+            raise ValueError(f'Unsupported artifact format version: {int(artifact["format_version"])}')
+
+        return ModelArtifact(
+            features = artifact['features'].tolist(),
+            powers = artifact['powers'],
+            coef = artifact['coef'],
+            intercept = float(artifact['intercept']),
+            imputer = dict(zip(artifact['imputer_columns'].tolist(), artifact['imputer_values'].tolist())),
+            prepared_imputer = dict(zip(
+                artifact['prepared_imputer_columns'].tolist(),
+                artifact['prepared_imputer_values'].tolist()
+            )) if 'prepared_imputer_columns' in artifact else {},
+            scaler = {
+                column : tuple(values)
+                for column, values in zip(artifact['scaler_columns'].tolist(), artifact['scaler_values'].tolist())
+            },
+            fingerprint = str(artifact['fingerprint'])
+        )
+
+################################################################################
+
+def data_fingerprint(X: pd.DataFrame, y: pd.Series = None) -> str:
+    '''
+        Return a hash that identifies a dataset by its column names and
+        values.
+
+        Parameters
+        ----------
+        X: DataFrame
+            The features of the dataset.
+
+        y: Series, default None
+            The target variable of the dataset.
+
+        Returns
+        -------
+        str: A hexadecimal sha256 digest.
+    '''
+
+    digest = hashlib.sha256()
+    digest.update(','.join(map(str, X.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(X, index = False).to_numpy().tobytes())
+
+    if y is not None:
+        digest.update(pd.util.hash_pandas_object(y, index = False).to_numpy().tobytes())
+
+    return digest.hexdigest()
@@ -0,0 +1,286 @@
+################################################################################
+#
+#
+#
+#       boosting.py
+#
+#       Description: This file contains a histogram based gradient boosted
+#           tree regressor. Each feature is quantized into at most 256 bins
+#           stored as uint8 codes once, and every split of every tree is found
+#           from per-bin gradient sums over those codes.
+#
+#       Classes:
+#
+#           HistogramGradientBoosting
+#
+#       Functions:
+#
+#           _bin_edges(X, max_bins)
+#           _bin_codes(X, edges)
+#           _predict_tree(tree, codes)
+#
+#
+################################################################################
+
+import numpy as np
+import pandas as pd
+
+################################################################################
+
+class HistogramGradientBoosting:
+    '''
+        A gradient boosted tree regressor with squared error loss that finds
+        splits from histograms of binned features.
+
+        The histograms for all features of a node are built with a single
+        bincount over the node's rows, and the histogram of the larger child
+        of a split is the parent's histogram minus the smaller child's.
+
+        Parameters
+        ----------
+        features: list[str]
+            The feature columns used by the model.
+
+        n_estimators: int, default 200
+            The number of trees.
+
+        learning_rate: float, default 0.1
+            The shrinkage applied to each tree.
+
+        max_depth: int, default 6
+            The maximum depth of each tree.
+
+        min_samples_leaf: int, default 20
+            The minimum number of rows in a leaf.
+
+        l2_regularization: float, default 1.0
+            The L2 penalty on leaf values.
+
+        max_bins: int, default 255
+            The maximum number of bins per feature, at most 256.
+    '''
+
+    def __init__(
+        self,
+        features: list[str],
+        n_estimators: int = 200,
+        learning_rate: float = 0.1,
+        max_depth: int = 6,
+        min_samples_leaf: int = 20,
+        l2_regularization: float = 1.0,
+        max_bins: int = 255
+    ):
+        if not 2 <= max_bins <= 256:
+            raise ValueError(f'max_bins must be between 2 and 256, not {max_bins}')
+
+        self.features = features
+        self.n_estimators = n_estimators
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.l2_regularization = l2_regularization
+        self.max_bins = max_bins
+
+        self.edges = None
+        self.baseline = None
+        self.trees = []
+
+    def fit(self, X: pd.DataFrame, y) -> 'HistogramGradientBoosting':
+        '''
+            Fit the model to the features in X and the target y.
+        '''
+
+        X = X[self.features].to_numpy(dtype = np.float64)
+        y = np.asarray(y, dtype = np.float64)
+
+        self.edges = _bin_edges(X, self.max_bins)
+        codes = _bin_codes(X, self.edges)
+
+        # Offsetting each feature's codes lets one bincount build the
+        # histograms of every feature at once
+        offsets = np.arange(len(self.features)) * self.max_bins
+        flat_codes = codes.astype(np.intp) + offsets
+
+        self.baseline = y.mean()
+        predictions = np.full(len(y), self.baseline)
+
+        self.trees = []
+        for _ in range(self.n_estimators):
+            gradients = predictions - y
+            tree, leaf_values = self._grow_tree(codes, flat_codes, gradients)
+            predictions += leaf_values
+            self.trees.append(tree)
+
+        return self
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        '''
+            Return the model's predictions for the features in X.
+        '''
+
+        codes = _bin_codes(X[self.features].to_numpy(dtype = np.float64), self.edges)
+
+        predictions = np.full(len(codes), self.baseline)
+        for tree in self.trees:
+            predictions += _predict_tree(tree, codes)
+
+        return predictions
+
+    def _grow_tree(self, codes: np.ndarray, flat_codes: np.ndarray, gradients: np.ndarray) -> tuple[dict, np.ndarray]:
+        '''
+            Grow one tree depth first. Return it as arrays of node features,
+            split bins, children, and leaf values, along with the leaf value
+            of every training row so the rows need not be run down the tree
+            again.
+        '''
+
+        nodes = {'feature' : [], 'bin' : [], 'left' : [], 'right' : [], 'value' : []}
+        leaf_values = np.empty(len(gradients))
+
+        def add_node() -> int:
+            for values in nodes.values():
+                values.append(-1)
+            return len(nodes['feature']) - 1
+
+        def grow(rows: np.ndarray, histogram: tuple[np.ndarray, np.ndarray], depth: int) -> int:
+            node = add_node()
+            gradient_sum = gradients[rows].sum()
+            nodes['value'][node] = -self.learning_rate * gradient_sum / (len(rows) + self.l2_regularization)
+
+            if depth == self.max_depth or len(rows) < 2 * self.min_samples_leaf:
+                leaf_values[rows] = nodes['value'][node]
+                return node
+
+            split = self._best_split(histogram, gradient_sum, len(rows))
+            if split is None:
+                leaf_values[rows] = nodes['value'][node]
+                return node
+
+            feature, split_bin = split
+            goes_left = codes[rows, feature] <= split_bin
+            left_rows, right_rows = rows[goes_left], rows[~goes_left]
+
+            # Build the smaller child's histogram and subtract for the other
+            if len(left_rows) <= len(right_rows):
+                left_histogram = self._histogram(flat_codes, gradients, left_rows)
+                right_histogram = (histogram[0] - left_histogram[0], histogram[1] - left_histogram[1])
+            else:
+                right_histogram = self._histogram(flat_codes, gradients, right_rows)
+                left_histogram = (histogram[0] - right_histogram[0], histogram[1] - right_histogram[1])
+
+            nodes['feature'][node] = feature
+            nodes['bin'][node] = split_bin
+            nodes['left'][node] = grow(left_rows, left_histogram, depth + 1)
+            nodes['right'][node] = grow(right_rows, right_histogram, depth + 1)
+
+            return node
+
+        rows = np.arange(len(gradients))
+        grow(rows, self._histogram(flat_codes, gradients, rows), 0)
+
+        return {name : np.array(values) for name, values in nodes.items()}, leaf_values
+
+    def _histogram(self, flat_codes: np.ndarray, gradients: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        '''
+            Return the gradient sums and row counts of each bin of each
+            feature for a node, as arrays of shape (features, bins).
+        '''
+
+        node_codes = flat_codes[rows].ravel()
+        size = len(self.features) * self.max_bins
+
+        gradient_sums = np.bincount(
+            node_codes,
+            weights = np.repeat(gradients[rows], len(self.features)),
+            minlength = size
+        )
+        counts = np.bincount(node_codes, minlength = size)
+
+        return gradient_sums.reshape(-1, self.max_bins), counts.reshape(-1, self.max_bins)
+
+    def _best_split(self, histogram: tuple[np.ndarray, np.ndarray], gradient_sum: float, n: int) -> tuple[int, int]:
+        '''
+            Return the feature and bin of the split with the largest gain, or
+            None if no split leaves min_samples_leaf rows on both sides.
+        '''
+
+        left_gradient = np.cumsum(histogram[0], axis = 1)
+        left_count = np.cumsum(histogram[1], axis = 1)
+        right_gradient = gradient_sum - left_gradient
+        right_count = n - left_count
+
+        valid = (left_count >= self.min_samples_leaf) & (right_count >= self.min_samples_leaf)
+        if not valid.any():
+            return None
+
+        gain = (
+            left_gradient ** 2 / (left_count + self.l2_regularization)
+            + right_gradient ** 2 / (right_count + self.l2_regularization)
+        )
+        gain[~valid] = -np.inf
+
+        feature, split_bin = np.unravel_index(np.argmax(gain), gain.shape)
+
+        if gain[feature, split_bin] <= gradient_sum ** 2 / (n + self.l2_regularization):
+            return None
+
+        return int(feature), int(split_bin)
+
+################################################################################
+
+def _bin_edges(X: np.ndarray, max_bins: int) -> list[np.ndarray]:
+    '''
+        Return the upper edges of the bins of each feature. Features with
+        few distinct values get one bin per value, the rest get quantile
+        bins computed from a sample of at most 200,000 rows.
+    '''
+
+    sample = X
+    if len(X) > 200_000:
+        sample = X[np.random.RandomState(24).choice(len(X), 200_000, replace = False)]
+
+    edges = []
+    for j in range(X.shape[1]):
+        values = np.unique(sample[:, j])
+
+        if len(values) <= max_bins:
+            edges.append((values[:-1] + values[1:]) / 2)
+        else:
+            quantiles = np.quantile(sample[:, j], np.linspace(0, 1, max_bins + 1)[1:-1])
+            edges.append(np.unique(quantiles))
+
+    return edges
+
+################################################################################
+
+def _bin_codes(X: np.ndarray, edges: list[np.ndarray]) -> np.ndarray:
+    '''
+        Return the bin code of every value as a uint8 matrix.
+    '''
+
+    codes = np.empty(X.shape, dtype = np.uint8, order = 'F')
+    for j, feature_edges in enumerate(edges):
+        codes[:, j] = np.searchsorted(feature_edges, X[:, j], side = 'left')
+
+    return codes
+
+################################################################################
+
+def _predict_tree(tree: dict, codes: np.ndarray) -> np.ndarray:
+    '''
+        Return the predictions of one tree for binned rows, moving every row
+        down one level of the tree at a time.
+    '''
+
+    node = np.zeros(len(codes), dtype = np.intp)
+    rows = np.arange(len(codes))
+
+    while True:
+        internal = tree['feature'][node] >= 0
+        if not internal.any():
+            return tree['value'][node]
+
+        active = rows[internal]
+        active_node = node[active]
+        goes_left = codes[active, tree['feature'][active_node]] <= tree['bin'][active_node]
+        node[active] = np.where(goes_left, tree['left'][active_node], tree['right'][active_node])
@@ -11,33 +11,56 @@
 #
 #           None
 #
+#       Classes:
+#
+#           RegressionMetrics
+#           MetricAccumulator
+#           ConstantBaseline
+#
 #       Functions:
 #
-#           plot_residuals(actual, predictions)
+#           plot_residuals(actual, predictions, kind, bins)
+#           residual_grid(actual, predictions, bins, clip)
+#           residual_bands(actual, predictions, bins, quantiles)
+#           regression_metrics(actual, predictions)
+#           evaluate_models(actual, predictions, names)
+#           segment_metrics(actual, predictions, segments)
 #           regression_errors(actual, predictions, print_results = True)
 #           baseline_mean_errors(actual, baseline, print_results = True)
-#           better_than_baseline(actual, predictions)
+#           better_than_baseline(actual, predictions, groups)
+#           bootstrap_rmse(actual, predictions, names, reference, n_resamples, confidence, random_seed, n_jobs)
 #           _SSE(actual, predictions)
 #           _ESS(actual, predictions)
 #           _TSS(actual, predictions)
 #           _MSE(actual, predictions)
 #           _RMSE(actual, predictions)
+#           _as_arrays(actual, predictions)
+#           _prediction_matrix(predictions, names)
+#           _resample_sums(seed, n_resamples)
+#           _group_codes(groups, n)
+#           _group_moments(actual, codes, n_groups)
 #
 #
 ################################################################################
 
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-from sklearn.metrics import mean_squared_error, explained_variance_score
+from util.parallel import worker_pool, worker_data, batch_seeds, resample_counts
 
 ################################################################################
 
-def plot_residuals(actual, predictions):
+def plot_residuals(actual, predictions, kind: str = 'auto', bins: int = 100):
     '''
         Create a residual plot using the predictions from a regression model 
         and the actual values.
+
+        Large datasets are drawn from aggregates rather than one marker per
+        row, so the time to render does not depend on the number of rows.
     
         Parameters
         ----------
@@ -46,15 +69,654 @@ def plot_residuals(actual, predictions):
     
         predictions: Array
             A numpy array containing the predictions from a regression model.
+
+        kind: str, default 'auto'
+            'scatter' plots every point, 'density' plots a 2-d histogram of
+            residual against actual value, and 'bands' plots quantile bands 
+            of the residuals over bins of the actual value. 'auto' uses 
+            'scatter' for up to 10,000 rows and 'density' otherwise.
+
+        bins: int, default 100
+            The number of bins along each axis for 'density', and the number
+            of actual value bins for 'bands'.
+
+        Returns
+        -------
+        DataFrame | None: The aggregated grid or bands that were plotted, or
+            None for a scatter plot.
     '''
 
+    if kind not in ('auto', 'scatter', 'density', 'bands'):
+        raise ValueError(f"kind must be 'auto', 'scatter', 'density', or 'bands', not {kind!r}")
+
+    actual, predictions = _as_arrays(actual, predictions)
     residuals = actual - predictions
+
+    if kind == 'auto':
+        kind = 'scatter' if len(actual) <= 10_000 else 'density'
+
+    aggregate = None
     plt.axhline(0, ls=':')
-    plt.scatter(actual, residuals)
+
+    if kind == 'scatter':
+        plt.scatter(actual, residuals)
+    elif kind == 'density':
+        aggregate = residual_grid(actual, predictions, bins)
+        x_edges = np.union1d(aggregate.actual_low, aggregate.actual_high)
+        y_edges = np.union1d(aggregate.residual_low, aggregate.residual_high)
+
+        # Empty cells are left out of the grid and are drawn blank
+        counts = np.full((len(y_edges) - 1, len(x_edges) - 1), np.nan)
+        counts[
+            np.searchsorted(y_edges, aggregate.residual_low),
+            np.searchsorted(x_edges, aggregate.actual_low)
+        ] = aggregate['count']
+
+        plt.pcolormesh(x_edges, y_edges, counts, norm = 'log', cmap = 'viridis')
+        plt.colorbar(label = 'Count')
+    else:
+        aggregate = residual_bands(actual, predictions, bins)
+        center = aggregate.actual_mean
+
+        plt.fill_between(center, aggregate['q0.05'], aggregate['q0.95'], alpha = 0.25, label = '5% - 95%')
+        plt.fill_between(center, aggregate['q0.25'], aggregate['q0.75'], alpha = 0.5, label = '25% - 75%')
+        plt.plot(center, aggregate['q0.5'], label = 'Median')
+        plt.legend()
+
     plt.xlabel('Actual')
     plt.ylabel('Residual')
     plt.title('Residuals for yhat')
 
+    return aggregate
+
+################################################################################
+
+def residual_grid(actual, predictions, bins: int = 100, clip: float = 0.001) -> pd.DataFrame:
+    '''
+        Returns a 2-d histogram of residual against actual value as a table
+        with one row per non-empty cell, suitable for plotting or exporting
+        to a dashboard.
+    
+        Parameters
+        ----------
+        actual: Series
+            A pandas series containing the actual values from a dataset.
+
+        predictions: Array
+            A numpy array containing the predictions from a regression model.
+
+        bins: int, default 100
+            The number of bins along each axis.
+
+        clip: float, default 0.001
+            The fraction of rows at each extreme of each axis left outside 
+            the grid, so a few outliers do not squeeze the rest into a 
+            handful of cells.
+    
+        Returns
+        -------
+        DataFrame: The actual_low, actual_high, residual_low, residual_high,
+            and count of each cell.
+    '''
+
+    actual, predictions = _as_arrays(actual, predictions)
+    residuals = actual - predictions
+
+    ranges = [np.quantile(values, [clip, 1 - clip]) for values in (actual, residuals)]
+    counts, x_edges, y_edges = np.histogram2d(actual, residuals, bins = bins, range = ranges)
+
+    x, y = np.nonzero(counts)
+
+    return pd.DataFrame({
+        'actual_low' : x_edges[x],
+        'actual_high' : x_edges[x + 1],
+        'residual_low' : y_edges[y],
+        'residual_high' : y_edges[y + 1],
+        'count' : counts[x, y].astype(np.int64)
+    })
+
+################################################################################
+
+def residual_bands(
+    actual,
+    predictions,
+    bins: int = 20,
+    quantiles: tuple[float, ...] = (0.05, 0.25, 0.5, 0.75, 0.95)
+) -> pd.DataFrame:
+    '''
+        Returns quantiles of the residuals within bins of the actual value. 
+        The bins hold roughly equal numbers of rows, and the quantiles of 
+        every bin are read from a single sort of the residuals by bin.
+    
+        Parameters
+        ----------
+        actual: Series
+            A pandas series containing the actual values from a dataset.
+
+        predictions: Array
+            A numpy array containing the predictions from a regression model.
+
+        bins: int, default 20
+            The number of actual value bins.
+
+        quantiles: tuple[float, ...], default (0.05, 0.25, 0.5, 0.75, 0.95)
+            The residual quantiles computed in each bin.
+    
+        Returns
+        -------
+        DataFrame: The actual_low, actual_high, actual_mean, and count of 
+            each bin, and a q<quantile> column for each quantile.
+    '''
+
+    actual, predictions = _as_arrays(actual, predictions)
+    residuals = actual - predictions
+
+    edges = np.unique(np.quantile(actual, np.linspace(0, 1, bins + 1)))
+    codes = np.clip(np.searchsorted(edges, actual, side = 'right') - 1, 0, len(edges) - 2)
+
+    ordered = residuals[np.lexsort((residuals, codes))]
+    counts = np.bincount(codes, minlength = len(edges) - 1)
+    starts = np.cumsum(counts) - counts
+
+    # Linear interpolation between order statistics, as np.quantile does
+    positions = starts[:, None] + np.asarray(quantiles)[None, :] * np.maximum(counts - 1, 0)[:, None]
+    low = np.floor(positions).astype(np.intp)
+    high = np.minimum(low + 1, starts[:, None] + np.maximum(counts - 1, 0)[:, None])
+    fraction = positions - low
+    values = ordered[low] * (1 - fraction) + ordered[high] * fraction
+
+    bands = pd.DataFrame({
+        'actual_low' : edges[:-1],
+        'actual_high' : edges[1:],
+        'actual_mean' : np.bincount(codes, actual, len(counts)) / np.maximum(counts, 1),
+        'count' : counts
+    })
+    for j, q in enumerate(quantiles):
+        bands[f'q{q}'] = values[:, j]
+
+    return bands[bands['count'] > 0].reset_index(drop = True)
+
+################################################################################
+
+class RegressionMetrics(NamedTuple):
+    '''
+        The error metrics for a regression model.
+    '''
+
+    SSE: float
+    ESS: float
+    TSS: float
+    MSE: float
+    RMSE: float
+
+    def to_series(self) -> pd.Series:
+        return pd.Series(self._asdict())
+
+################################################################################
+
+def regression_metrics(actual, predictions) -> RegressionMetrics:
+    '''
+        Returns the error metrics for a regression model (SSE, ESS, TSS, MSE,
+        and RMSE), computed together from two sums over contiguous float 
+        arrays.
+    
+        Parameters
+        ----------
+        actual: Series
+            A pandas series containing the actual values from a dataset.
+
+        predictions: Array
+            A numpy array containing the predictions from a regression model.
+    
+        Returns
+        -------
+        RegressionMetrics: The metric scores for the regression model.
+    '''
+
+    actual, predictions = _as_arrays(actual, predictions)
+
+    residuals = actual - predictions
+    sse = float(residuals @ residuals)
+
+    np.subtract(predictions, actual.mean(), out = residuals)
+    ess = float(residuals @ residuals)
+
+    mse = sse / len(actual)
+
+    return RegressionMetrics(SSE = sse, ESS = ess, TSS = sse + ess, MSE = mse, RMSE = float(np.sqrt(mse)))
+
+################################################################################
+
+class MetricAccumulator:
+    '''
+        Accumulates regression error metrics over chunks of actual values and
+        predictions, so the full arrays never need to be held in memory. 
+        Accumulators updated on different chunks, for example by different
+        workers, can be merged with + and give the same metrics as one
+        accumulator updated on all the chunks.
+
+        Means and sums of squared deviations are combined with Welford's
+        method, which stays accurate for large values such as property 
+        prices. Quantiles of the absolute error come from a log-bucketed
+        sketch with a bounded relative error.
+
+        Parameters
+        ----------
+        relative_accuracy: float, default 0.01
+            The relative accuracy of the absolute error quantiles.
+    '''
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self._log_gamma = np.log((1 + relative_accuracy) / (1 - relative_accuracy))
+
+        self.n = 0
+        self.actual_mean = 0.0
+        self.actual_m2 = 0.0
+        self.predictions_mean = 0.0
+        self.predictions_m2 = 0.0
+        self.sse = 0.0
+        self.sae = 0.0
+        self.zero_errors = 0
+        self.error_buckets = {}
+
+    def update(self, actual, predictions) -> 'MetricAccumulator':
+        '''
+            Add a chunk of actual values and predictions.
+        '''
+
+        actual, predictions = _as_arrays(actual, predictions)
+        predictions = np.broadcast_to(predictions, actual.shape)
+        if not len(actual):
+            return self
+
+        residuals = actual - predictions
+        errors = np.abs(residuals)
+
+        chunk = MetricAccumulator(self.relative_accuracy)
+        chunk.n = len(actual)
+        chunk.actual_mean = actual.mean()
+        chunk.actual_m2 = float(((actual - chunk.actual_mean) ** 2).sum())
+        chunk.predictions_mean = predictions.mean()
+        chunk.predictions_m2 = float(((predictions - chunk.predictions_mean) ** 2).sum())
+        chunk.sse = float(residuals @ residuals)
+        chunk.sae = float(errors.sum())
+
+        positive = errors[errors > 0]
+        chunk.zero_errors = len(errors) - len(positive)
+        buckets, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts = True)
+        chunk.error_buckets = dict(zip(buckets.tolist(), counts.tolist()))
+
+        self._merge(chunk)
+        return self
+
+    def __add__(self, other: 'MetricAccumulator') -> 'MetricAccumulator':
+        merged = MetricAccumulator(self.relative_accuracy)
+        merged._merge(self)
+        merged._merge(other)
+        return merged
+
+    def regression_metrics(self) -> RegressionMetrics:
+        '''
+            Returns the same metrics as regression_metrics over every chunk.
+        '''
+
+        ess = self.predictions_m2 + self.n * (self.predictions_mean - self.actual_mean) ** 2
+        mse = self.sse / self.n
+
+        return RegressionMetrics(SSE = self.sse, ESS = ess, TSS = self.sse + ess, MSE = mse, RMSE = float(np.sqrt(mse)))
+
+    def regression_errors(self) -> pd.Series:
+        '''
+            Returns the same series as regression_errors with print_results
+            set to False.
+        '''
+
+        return self.regression_metrics().to_series()
+
+    def baseline_mean_errors(self) -> pd.Series:
+        '''
+            Returns the same series as baseline_mean_errors with 
+            print_results set to False, for a baseline that predicts the mean
+            of the actual values.
+        '''
+
+        return pd.Series({
+            'SSE' : self.actual_m2,
+            'MSE' : self.actual_m2 / self.n,
+            'RMSE' : float(np.sqrt(self.actual_m2 / self.n))
+        })
+
+    def mae(self) -> float:
+        '''
+            Returns the mean absolute error.
+        '''
+
+        return self.sae / self.n
+
+    def error_quantile(self, q: float) -> float:
+        '''
+            Returns the q quantile of the absolute error, within the relative
+            accuracy of the sketch.
+        '''
+
+        rank = q * (self.n - 1)
+        if rank < self.zero_errors:
+            return 0.0
+
+        buckets = sorted(self.error_buckets)
+        counts = np.cumsum([self.error_buckets[bucket] for bucket in buckets]) + self.zero_errors
+        bucket = buckets[int(np.searchsorted(counts, rank, side = 'right'))]
+
+        gamma = np.exp(self._log_gamma)
+        return float(2 * gamma ** bucket / (gamma + 1))
+
+    def _merge(self, other: 'MetricAccumulator') -> None:
+        n = self.n + other.n
+        if not n:
+            return
+
+        actual_delta = other.actual_mean - self.actual_mean
+        predictions_delta = other.predictions_mean - self.predictions_mean
+
+        self.actual_m2 += other.actual_m2 + actual_delta ** 2 * self.n * other.n / n
+        self.predictions_m2 += other.predictions_m2 + predictions_delta ** 2 * self.n * other.n / n
+        self.actual_mean += actual_delta * other.n / n
+        self.predictions_mean += predictions_delta * other.n / n
+
+        self.n = n
+        self.sse += other.sse
+        self.sae += other.sae
+        self.zero_errors += other.zero_errors
+        for bucket, count in other.error_buckets.items():
+            self.error_buckets[bucket] = self.error_buckets.get(bucket, 0) + count
+
+################################################################################
+
+def evaluate_models(actual, predictions, names: list[str] = None) -> pd.DataFrame:
+    '''
+        Returns the error metrics of many regression models at once, with a
+        row for the mean baseline and a row for each model.
+
+        The predictions of all models are scored together with matrix
+        operations over blocks of rows, so the cost is close to one pass
+        over the prediction matrix.
+    
+        Parameters
+        ----------
+        actual: Series
+            A pandas series containing the actual values from a dataset.
+
+        predictions: DataFrame | Array
+            A pandas dataframe with one column per model, or a 2-d numpy 
+            array with one row per observation and one column per model.
+
+        names: list[str], default None
+            The model names. If None the dataframe columns are used, or 
+            Model_1, Model_2, ... for an array.
+    
+        Returns
+        -------
+        DataFrame: A pandas dataframe indexed by model with the SSE, ESS, 
+            TSS, MSE, and RMSE of each model and whether it is better than
+            the baseline.
+    '''
+
+    predictions, names = _prediction_matrix(predictions, names)
+    actual = np.ascontiguousarray(actual, dtype = np.float64).ravel()
+    mean = actual.mean()
+
+    sse = np.zeros(predictions.shape[1])
+    ess = np.zeros(predictions.shape[1])
+    baseline_sse = 0.0
+
+    # Score blocks of rows so the residual matrix stays around 8 million values
+    block = max(1, 8_000_000 // predictions.shape[1])
+    for start in range(0, len(actual), block):
+        block_predictions = predictions[start:start + block]
+
+        residuals = actual[start:start + block, None] - block_predictions
+        sse += np.einsum('ij,ij->j', residuals, residuals)
+
+        baseline_residuals = actual[start:start + block, None] - mean
+        baseline_sse += np.einsum('ij,ij->j', baseline_residuals, baseline_residuals)[0]
+
+        np.subtract(block_predictions, mean, out = residuals)
+        ess += np.einsum('ij,ij->j', residuals, residuals)
+
+    sse = np.concatenate([[baseline_sse], sse])
+    ess = np.concatenate([[0.0], ess])
+    mse = sse / len(actual)
+
+    # A model that predicts the mean only differs from the baseline by rounding
+    better = (mse < mse[0]) & ~np.isclose(mse, mse[0], rtol = 1e-9, atol = 0)
+
+    return pd.DataFrame({
+        'SSE' : sse,
+        'ESS' : ess,
+        'TSS' : sse + ess,
+        'MSE' : mse,
+        'RMSE' : np.sqrt(mse),
+        'better_than_baseline' : better
+    }, index = pd.Index(['Baseline'] + names, name = 'model'))
+
+################################################################################
+
+class ConstantBaseline:
+    '''
+        A baseline model that predicts a constant, either the mean or the 
+        median of the target, with a separate constant for each group when 
+        groups such as counties are given.
+
+        The baseline is fit and scored from per-group summary statistics (the
+        count, mean, variance, median, and mean absolute deviations around 
+        the mean and the median), since the squared error of a constant c on
+        a group is n * (variance + (mean - c) ** 2). A prediction vector is 
+        only built when predict is called.
+
+        Parameters
+        ----------
+        statistic: str, default 'best'
+            'mean', 'median', or 'best' to use whichever of the two has the
+            lower training RMSE.
+    '''
+
+    def __init__(self, statistic: str = 'best'):
+        if statistic not in ('best', 'mean', 'median'):
+            raise ValueError(f"statistic must be 'best', 'mean', or 'median', not {statistic!r}")
+
+        self.statistic = statistic
+
+        self.summary = None
+        self.constants = None
+        self.overall = None
+
+    def fit(self, target, groups = None) -> 'ConstantBaseline':
+        '''
+            Compute the summary statistics of the target, for each group if
+            groups are given, and choose the constant predicted for each 
+            group.
+
+            Parameters
+            ----------
+            target: Series
+                The target variable.
+
+            groups: Series, default None
+                The group of each row, for example the county.
+        '''
+
+        target = np.ascontiguousarray(target, dtype = np.float64).ravel()
+        codes, labels = _group_codes(groups, len(target))
+
+        counts, means, m2 = _group_moments(target, codes, len(labels))
+        deviations = target - means[codes]
+
+        # Sorting by group and then value puts each group's median in the
+        # middle of its run of rows
+        ordered = target[np.lexsort((target, codes))]
+        sizes = counts.astype(np.intp)
+        starts = np.cumsum(sizes) - sizes
+        medians = (ordered[starts + (sizes - 1) // 2] + ordered[starts + sizes // 2]) / 2
+
+        self.summary = pd.DataFrame({
+            'count' : counts,
+            'mean' : means,
+            'variance' : m2 / counts,
+            'median' : medians,
+            'mean_deviation' : np.bincount(codes, np.abs(deviations), len(labels)) / counts,
+            'median_deviation' : np.bincount(codes, np.abs(target - medians[codes]), len(labels)) / counts
+        }, index = labels)
+
+        statistic = self.statistic
+        if statistic == 'best':
+            median_sse = (counts * (self.summary.variance + (means - medians) ** 2)).sum()
+            statistic = 'median' if median_sse < m2.sum() else 'mean'
+
+        self.statistic_ = statistic
+        self.constants = self.summary[statistic]
+        self.overall = float(target.mean() if statistic == 'mean' else np.median(target))
+
+        return self
+
+    def score(self, actual = None, groups = None) -> RegressionMetrics:
+        '''
+            Return the error metrics of the baseline, on the training target
+            if actual is None, otherwise on actual. Groups not seen in
+            training are given the overall training constant.
+
+            Parameters
+            ----------
+            actual: Series, default None
+                The actual values to score the baseline on.
+
+            groups: Series, default None
+                The group of each actual value.
+    
+            Returns
+            -------
+            RegressionMetrics: The metric scores for the baseline.
+        '''
+
+        if actual is None:
+            counts = self.summary['count'].to_numpy(dtype = np.float64)
+            means = self.summary['mean'].to_numpy()
+            m2 = counts * self.summary.variance.to_numpy()
+            constants = self.constants.to_numpy()
+        else:
+            actual = np.ascontiguousarray(actual, dtype = np.float64).ravel()
+            codes = self._codes(groups, len(actual))
+            constants = np.append(self.constants.to_numpy(), self.overall)
+            counts, means, m2 = _group_moments(actual, codes, len(constants))
+
+        n = float(counts.sum())
+        mean = (counts * means).sum() / n
+
+        sse = float((m2 + counts * (means - constants) ** 2).sum())
+        ess = float((counts * (constants - mean) ** 2).sum())
+        mse = sse / n
+
+        return RegressionMetrics(SSE = sse, ESS = ess, TSS = sse + ess, MSE = mse, RMSE = float(np.sqrt(mse)))
+
+    def mae(self) -> float:
+        '''
+            Return the mean absolute error of the baseline on the training 
+            target.
+        '''
+
+        deviations = self.summary[f'{self.statistic_}_deviation']
+        return float((deviations * self.summary['count']).sum() / self.summary['count'].sum())
+
+    def predict(self, groups = None, n: int = None) -> np.ndarray:
+        '''
+            Return the baseline's prediction vector, for the rows of groups 
+            or for n rows of an ungrouped baseline.
+        '''
+
+        if groups is None and n is None:
+            raise ValueError('predict needs groups or n')
+
+        codes = self._codes(groups, len(groups) if groups is not None else n)
+        return np.append(self.constants.to_numpy(), self.overall)[codes]
+
+    def _codes(self, groups, n: int) -> np.ndarray:
+        '''
+            Return the position of each row's group among the fitted groups,
+            with unseen groups placed after the last fitted group.
+        '''
+
+        if groups is None:
+            # An ungrouped fit has one constant, a grouped fit uses the overall one
+            return np.full(n, 0 if self.constants.index.equals(pd.Index(['all'])) else len(self.constants), dtype = np.intp)
+
+        codes = self.constants.index.get_indexer(pd.Index(groups))
+        codes[codes < 0] = len(self.constants)
+
+        return codes
+
+################################################################################
+
+def segment_metrics(actual, predictions, segments) -> pd.DataFrame:
+    '''
+        Returns the error metrics of a regression model within each segment
+        of the data, such as each county, bedroom count, age band, or value 
+        decile, along with the RMSE of the mean baseline in each segment.
+
+        Each segmentation is scored with one pass of bincounts over its 
+        segment codes, so hundreds of segments cost about as much as one 
+        overall metric. Bands and deciles can be made with pd.cut and 
+        pd.qcut.
+    
+        Parameters
+        ----------
+        actual: Series
+            A pandas series containing the actual values from a dataset.
+
+        predictions: Array
+            A numpy array containing the predictions from a regression model.
+
+        segments: Series | DataFrame
+            The segment of each row, or a dataframe with one column per 
+            segmentation, for example county dummies and bedroom counts.
+    
+        Returns
+        -------
+        DataFrame: The count, SSE, MSE, RMSE, baseline RMSE, and whether the
+            model is better than the baseline in each segment, indexed by 
+            segmentation and segment.
+    '''
+
+    actual, predictions = _as_arrays(actual, predictions)
+    residuals = actual - predictions
+    squared_residuals = residuals * residuals
+    overall_mean = actual.mean()
+
+    if not isinstance(segments, pd.DataFrame):
+        segments = pd.DataFrame({getattr(segments, 'name', None) or 'segment' : segments})
+
+    tables = {}
+    for column in segments.columns:
+        codes, labels = _group_codes(segments[column], len(actual))
+        counts, means, m2 = _group_moments(actual, codes, len(labels))
+
+        sse = np.bincount(codes, squared_residuals, len(labels))
+        mse = sse / counts
+
+        # The baseline predicts the overall mean, whose squared error in a
+        # segment follows from the segment's own mean and variance
+        baseline_rmse = np.sqrt((m2 + counts * (means - overall_mean) ** 2) / counts)
+
+        tables[column] = pd.DataFrame({
+            'count' : counts.astype(np.int64),
+            'SSE' : sse,
+            'MSE' : mse,
+            'RMSE' : np.sqrt(mse),
+            'baseline_RMSE' : baseline_rmse,
+            'better_than_baseline' : np.sqrt(mse) < baseline_rmse
+        }, index = pd.Index(labels, name = 'segment'))
+
+    return pd.concat(tables, names = ['segmentation'])
+
 ################################################################################
 
 def regression_errors(actual, predictions, print_results: bool = True) -> pd.core.series.Series:
@@ -80,22 +742,18 @@ def regression_errors(actual, predictions, print_results: bool = True) -> pd.cor
             floats containing the metric scores for the baseline model.
     '''
 
+    metrics = regression_metrics(actual, predictions)
+
     if print_results:
         print(f'''
-            sum of squared errors (SSE):     {_SSE(actual, predictions)}
-            explained sum of squares (ESS):  {_ESS(actual, predictions)}
-            total sum of squares (TSS):      {_TSS(actual, predictions)}
-            mean squared error (MSE):        {_MSE(actual, predictions)}
-            root mean squared error (RMSE):  {_RMSE(actual, predictions)}
+            sum of squared errors (SSE):     {metrics.SSE}
+            explained sum of squares (ESS):  {metrics.ESS}
+            total sum of squares (TSS):      {metrics.TSS}
+            mean squared error (MSE):        {metrics.MSE}
+            root mean squared error (RMSE):  {metrics.RMSE}
         ''')
     else:
-        return pd.Series({
-            'SSE' : _SSE(actual, predictions),
-            'ESS' : _ESS(actual, predictions),
-            'TSS' : _TSS(actual, predictions),
-            'MSE' : _MSE(actual, predictions),
-            'RMSE' : _RMSE(actual, predictions)
-        })
+        return metrics.to_series()
 
 ################################################################################
 
@@ -122,25 +780,28 @@ def baseline_mean_errors(actual, baseline, print_results: bool = True) -> pd.cor
             floats containing the metric scores for the baseline model.
     '''
 
+    metrics = regression_metrics(actual, baseline)
+
     if print_results:
         print(f'''
-            Baseline sum of squared errors (SSE):     {_SSE(actual, baseline)}
-            Baseline mean squared error (MSE):        {_MSE(actual, baseline)}
-            Baseline root mean squared error (RMSE):  {_RMSE(actual, baseline)}
+            Baseline sum of squared errors (SSE):     {metrics.SSE}
+            Baseline mean squared error (MSE):        {metrics.MSE}
+            Baseline root mean squared error (RMSE):  {metrics.RMSE}
         ''')
     else:
         return pd.Series({
-            'SSE' : _SSE(actual, baseline),
-            'MSE' : _MSE(actual, baseline),
-            'RMSE' : _RMSE(actual, baseline)
+            'SSE' : metrics.SSE,
+            'MSE' : metrics.MSE,
+            'RMSE' : metrics.RMSE
         })
 
 ################################################################################
 
-def better_than_baseline(actual, predictions) -> bool:
+def better_than_baseline(actual, predictions, groups = None) -> bool:
     '''
         Returns True if the model's predictions are better than the baseline's 
-        predictions using the root mean squared error score.
+        predictions using the root mean squared error score. The baseline
+        predicts the mean, or the mean of each group if groups are given.
     
         Parameters
         ----------
@@ -149,14 +810,121 @@ def better_than_baseline(actual, predictions) -> bool:
 
         predictions: Array
             A numpy array containing the predictions from a regression model.
+
+        groups: Series, default None
+            The group of each actual value, for example the county.
     
         Returns
         -------
         bool: Whether or not the model performs better than the baseline.
     '''
 
-    baseline = _RMSE(actual, pd.Series([actual.mean()] * len(actual)))
-    return _RMSE(actual, predictions) < baseline
+    baseline = ConstantBaseline('mean').fit(actual, groups).score()
+    return _RMSE(actual, predictions) < baseline.RMSE
+
+################################################################################
+
+def bootstrap_rmse(
+    actual,
+    predictions,
+    names: list[str] = None,
+    reference: str = 'Baseline',
+    n_resamples: int = 1000,
+    confidence: float = 0.95,
+    random_seed: int = 24,
+    n_jobs: int = 1
+) -> pd.DataFrame:
+    '''
+        Returns bootstrap confidence intervals for the RMSE of the mean 
+        baseline and of one or more models, and for the difference between
+        each RMSE and the RMSE of a reference model.
+
+        The resamples are paired: every model and the baseline are scored on
+        the same resampled rows, so the intervals for differences account
+        for the models erring on the same rows. Each batch of resamples is 
+        drawn as one index matrix and turned into resample counts per row, 
+        and one matrix product with the squared errors scores every model
+        on every resample in the batch. Batches can be spread across 
+        processes that each receive the squared errors once.
+    
+        Parameters
+        ----------
+        actual: Series
+            A pandas series containing the actual values from a dataset.
+
+        predictions: DataFrame | Array
+            A pandas dataframe with one column per model, or a numpy array 
+            with the predictions of one model or one column per model.
+
+        names: list[str], default None
+            The model names. If None the dataframe columns are used, or 
+            Model_1, Model_2, ... for an array.
+
+        reference: str, default 'Baseline'
+            The model that differences are taken against, 'Baseline' or one
+            of the model names. If None no differences are computed.
+
+        n_resamples: int, default 1000
+            The number of bootstrap resamples.
+
+        confidence: float, default 0.95
+            The confidence level of the intervals.
+
+        random_seed: int, default 24
+            The random seed used to draw the resamples.
+
+        n_jobs: int, default 1
+            The number of processes used to score the resamples, -1 for
+            all cores.
+    
+        Returns
+        -------
+        DataFrame: The RMSE and its lower and upper bounds for the baseline 
+            and each model and, if reference is given, the difference from 
+            the reference RMSE with its bounds and the fraction of resamples
+            in which the model has the lower RMSE.
+    '''
+
+    predictions, names = _prediction_matrix(predictions, names)
+    actual = np.ascontiguousarray(actual, dtype = np.float64).ravel()
+
+    # Centering keeps the baseline variance accurate for large values
+    centered = actual - actual.mean()
+    columns = np.column_stack([(actual[:, None] - predictions) ** 2, centered, centered ** 2])
+
+    n = len(actual)
+    batch_size = max(1, min(64, 10_000_000 // n))
+    sizes, seeds = batch_seeds(n_resamples, batch_size, random_seed)
+
+    with worker_pool(n_jobs, columns = columns) as map_batches:
+        batches = list(map_batches(_resample_sums, seeds, sizes))
+
+    sums = np.vstack(batches) / n
+    baseline_mse = np.maximum(sums[:, -1] - sums[:, -2] ** 2, 0)
+    resampled = np.sqrt(np.column_stack([baseline_mse, sums[:, :-2]]))
+
+    full = columns.mean(axis = 0)
+    estimate = np.sqrt(np.concatenate([[full[-1] - full[-2] ** 2], full[:-2]]))
+
+    names = ['Baseline'] + names
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(resampled, [tail, 100 - tail], axis = 0)
+
+    results = pd.DataFrame({
+        'RMSE' : estimate,
+        'lower' : lower,
+        'upper' : upper
+    }, index = pd.Index(names, name = 'model'))
+
+    if reference is not None:
+        j = names.index(reference)
+        differences = resampled - resampled[:, [j]]
+
+        results['difference'] = estimate - estimate[j]
+        results['difference_lower'], results['difference_upper'] = np.percentile(differences, [tail, 100 - tail], axis = 0)
+        results['probability_better'] = (differences < 0).mean(axis = 0)
+
+    return results
 
 ################################################################################
 
@@ -177,7 +945,10 @@ def _SSE(actual, predictions) -> float:
         float: The sum of squared errors for a regression model.
     '''
 
-    return mean_squared_error(actual, predictions) * len(actual)
+    actual, predictions = _as_arrays(actual, predictions)
+    residuals = actual - predictions
+
+    return float(residuals @ residuals)
 
 ################################################################################
 
@@ -198,7 +969,10 @@ def _ESS(actual, predictions) -> float:
         float: The explained sum of squares for a regression model.
     '''
 
-    return sum((predictions - actual.mean()) ** 2)
+    actual, predictions = _as_arrays(actual, predictions)
+    deviations = predictions - actual.mean()
+
+    return float(deviations @ deviations)
 
 ################################################################################
 
@@ -219,7 +993,7 @@ def _TSS(actual, predictions) -> float:
         float: The total sum of squares score for a regression model.
     '''
 
-    return _SSE(actual, predictions) + _ESS(actual, predictions)
+    return regression_metrics(actual, predictions).TSS
 
 ################################################################################
 
@@ -240,7 +1014,7 @@ def _MSE(actual, predictions) -> float:
         float: The mean squared error score for a regression model.
     '''
 
-    return mean_squared_error(actual, predictions)
+    return _SSE(actual, predictions) / len(actual)
 
 ################################################################################
 
@@ -261,4 +1035,86 @@ def _RMSE(actual, predictions) -> float:
         float: The root mean squared error score for a regression model.
     '''
 
-    return mean_squared_error(actual, predictions, squared = False)
\ No newline at end of file
+    return float(np.sqrt(_MSE(actual, predictions)))
+
+################################################################################
+
+def _as_arrays(actual, predictions) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        Returns actual and predictions as contiguous float64 numpy arrays,
+        matched by position rather than by index.
+    '''
+
+    actual = np.ascontiguousarray(actual, dtype = np.float64).ravel()
+    predictions = np.ascontiguousarray(predictions, dtype = np.float64).ravel()
+
+    return actual, predictions
+
+################################################################################
+
+def _prediction_matrix(predictions, names: list[str] = None) -> tuple[np.ndarray, list[str]]:
+    '''
+        Returns predictions as a float64 matrix with one column per model, 
+        and the model names.
+    '''
+
+    if names is None:
+        if isinstance(predictions, pd.DataFrame):
+            names = [str(column) for column in predictions.columns]
+        else:
+            names = [f'Model_{i + 1}' for i in range(np.shape(predictions)[1] if np.ndim(predictions) > 1 else 1)]
+
+    predictions = np.asarray(predictions, dtype = np.float64)
+    if predictions.ndim == 1:
+        predictions = predictions[:, None]
+
+    return predictions, names
+
+################################################################################
+
+def _resample_sums(seed: np.random.SeedSequence, n_resamples: int) -> np.ndarray:
+    '''
+        Draw a batch of resamples as one index matrix and return the sum of
+        each column over each resample, weighting each row by the number of
+        times it was drawn.
+    '''
+
+    columns = worker_data()['columns']
+    weights = resample_counts(seed, n_resamples, len(columns))
+
+    return weights.astype(np.float64) @ columns
+
+################################################################################
+
+def _group_codes(groups, n: int) -> tuple[np.ndarray, pd.Index]:
+    '''
+        Return an integer code for the group of each row and the group 
+        labels, in sorted order. Without groups every row is in a single 
+        group labelled 'all'.
+    '''
+
+    if groups is None:
+        return np.zeros(n, dtype = np.intp), pd.Index(['all'])
+
+    # A categorical keeps its category order, such as bands from pd.cut
+    groups = groups if isinstance(groups, pd.Series) else np.asarray(groups)
+    codes, labels = pd.factorize(groups, sort = True, use_na_sentinel = False)
+
+    return codes, pd.Index(labels)
+
+################################################################################
+
+def _group_moments(values: np.ndarray, codes: np.ndarray, n_groups: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+        Return the count, mean, and sum of squared deviations from the mean
+        of the values in each group. Empty groups have a count of zero.
+    '''
+
+    counts = np.bincount(codes, minlength = n_groups).astype(np.float64)
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        means = np.bincount(codes, values, n_groups) / counts
+    means[counts == 0] = 0.0
+
+    m2 = np.bincount(codes, (values - means[codes]) ** 2, n_groups)
+
+    return counts, means, m2
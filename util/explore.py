@@ -18,6 +18,7 @@
 #           plot_quality_and_age(df)
 #           plot_amenities_and_location(df)
 #           statistical_tests(df, variable)
+#           correlation_tests(df, variables, method)
 #
 #
 ################################################################################
@@ -149,4 +150,30 @@ def plot_amenities_and_location(df: pd.DataFrame) -> None:
 def statistical_tests(df: pd.DataFrame, variable: str) -> None:
 
 
-    stats_util.correlation_test(df[variable], df.property_tax_assessed_values)
\ No newline at end of file
+    stats_util.correlation_test(df[variable], df.property_tax_assessed_values)
+
+################################################################################
+
+def correlation_tests(df: pd.DataFrame, variables: list[str] = None, method: str = 'pearson') -> pd.DataFrame:
+    '''
+        Test the correlation of each variable with the property value in one
+        batch and return the results, strongest correlation first.
+    
+        Parameters
+        ----------
+        df: DataFrame
+            The zillow dataset.
+
+        variables: list[str], default None
+            The variables to test. If None every numeric column is tested.
+
+        method: str, default 'pearson'
+            'pearson' or 'spearman'.
+
+        Returns
+        -------
+        DataFrame: The r and p value of each variable's correlation test.
+    '''
+
+    results = stats_util.correlation_matrix(df, 'property_tax_assessed_values', variables, method)
+    return results.reindex(results.r.abs().sort_values(ascending = False).index).reset_index(drop = True)
@@ -0,0 +1,801 @@
+################################################################################
+#
+#
+#
+#       linear.py
+#
+#       Description: This file contains numpy implementations of polynomial
+#           feature expansion and least squares regression solved from
+#           sufficient statistics. Nothing in this file depends on sklearn.
+#
+#       Variables:
+#
+#           _chunk_rows
+#
+#       Classes:
+#
+#           SufficientStatistics
+#           PolynomialRegression
+#
+#       Functions:
+#
+#           polynomial_terms(n_features, degree, interaction_only)
+#           polynomial_powers(terms, n_features)
+#           terms_from_powers(powers)
+#           expand_polynomial(X, terms, dtype)
+#           expand_next_degree(X, block, block_terms, terms)
+#           extend_sufficient_statistics(stats, blocks, X_new, y)
+#           sufficient_statistics(X, y, weights)
+#           solve_least_squares(stats, alpha)
+#           condition_number(stats, rcond)
+#           ridge_path(stats, alphas)
+#           lasso_path(stats, alphas, max_iter, tol)
+#           predict_linear(X_poly, coef, intercept)
+#           polynomial_names(terms, features)
+#           _standardize(stats)
+#
+#
+################################################################################
+
+import warnings
+from dataclasses import dataclass
+from itertools import combinations, combinations_with_replacement
+
+import numpy as np
+
+################################################################################
+
+# Rows per chunk when accumulating single precision statistics
+_chunk_rows = 65_536
+
+################################################################################
+
+@dataclass
+class SufficientStatistics:
+    '''
+        The sums needed to solve a least squares regression without going back
+        to the rows that produced them. Statistics for disjoint sets of rows
+        can be added together, and statistics for a subset of rows can be
+        subtracted from the statistics of the whole.
+
+        Attributes
+        ----------
+        n: float
+            The number of rows.
+
+        x_sum: ndarray
+            The column sums of the design matrix.
+
+        y_sum: float
+            The sum of the target.
+
+        xtx: ndarray
+            The gram matrix X'X.
+
+        xty: ndarray
+            The cross product X'y.
+
+        yty: float
+            The sum of the squared target.
+    '''
+
+    n: float
+    x_sum: np.ndarray
+    y_sum: float
+    xtx: np.ndarray
+    xty: np.ndarray
+    yty: float
+
+    def __add__(self, other: 'SufficientStatistics') -> 'SufficientStatistics':
+        return SufficientStatistics(
+            n = self.n + other.n,
+            x_sum = self.x_sum + other.x_sum,
+            y_sum = self.y_sum + other.y_sum,
+            xtx = self.xtx + other.xtx,
+            xty = self.xty + other.xty,
+            yty = self.yty + other.yty
+        )
+
+    def __sub__(self, other: 'SufficientStatistics') -> 'SufficientStatistics':
+        return SufficientStatistics(
+            n = self.n - other.n,
+            x_sum = self.x_sum - other.x_sum,
+            y_sum = self.y_sum - other.y_sum,
+            xtx = self.xtx - other.xtx,
+            xty = self.xty - other.xty,
+            yty = self.yty - other.yty
+        )
+
+################################################################################
+
+@dataclass
+class PolynomialRegression:
+    '''
+        A least squares regression on a polynomial expansion of a list of 
+        features. The fitted model keeps its sufficient statistics, so rows
+        can be added with partial_fit or taken out with remove at a cost 
+        proportional to the rows changed rather than the full history.
+
+        Attributes
+        ----------
+        features: list[str]
+            The feature columns used by the model.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        interaction_only: bool, default False
+            If True only products of distinct features are used.
+
+        alpha: float, default 0.0
+            An L2 penalty applied to the coefficients of the standardized 
+            columns.
+
+        coef: ndarray
+            The fitted coefficients, one for each polynomial term.
+
+        intercept: float
+            The fitted intercept.
+
+        stats: SufficientStatistics
+            The sufficient statistics of the training rows.
+
+        dtype: default np.float64
+            The floating point type used to expand and predict. With 
+            np.float32 the inputs are centered and scaled before expansion,
+            and fit falls back to np.float64 when the standardized gram 
+            matrix is too ill conditioned for single precision.
+
+        max_condition: float, default 1e4
+            The largest condition number of the standardized gram matrix
+            accepted by a float32 fit.
+
+        input_scaler: dict[str, tuple[float, float]]
+            The (min, scale) pair applied to each feature before expansion,
+            in the form of a MinMaxScaler. Only set for float32 fits.
+
+        condition_number: float
+            The condition number of the standardized gram matrix of a 
+            float32 fit.
+    '''
+
+    features: list[str]
+    degree: int = 2
+    interaction_only: bool = False
+    alpha: float = 0.0
+    coef: np.ndarray = None
+    intercept: float = None
+    stats: SufficientStatistics = None
+    dtype: type = np.float64
+    max_condition: float = 1e4
+    input_scaler: dict[str, tuple[float, float]] = None
+    condition_number: float = None
+
+    @property
+    def terms(self) -> list[tuple[int]]:
+        return polynomial_terms(len(self.features), self.degree, self.interaction_only)
+
+    def expand(self, X) -> np.ndarray:
+        '''
+            Return the polynomial expansion of the model's features in X.
+        '''
+
+        X = X[self.features]
+
+        if self.input_scaler is not None:
+            X = X.to_numpy(dtype = np.float64) * self._input_scale + self._input_min
+
+        return expand_polynomial(X, self.terms, self.dtype)
+
+    def fit(self, X, y) -> 'PolynomialRegression':
+        '''
+            Fit the model to the features in X and the target y.
+        '''
+
+        if self.dtype == np.float32:
+            self._set_input_scaler(X)
+
+        self.stats = sufficient_statistics(self.expand(X), y)
+
+        if self.dtype == np.float32:
+            # Duplicate columns are only as exact as the single precision
+            # products they were summed from
+            self.condition_number = condition_number(self.stats, len(self.stats.x_sum) * np.finfo(np.float32).eps)
+
+            if self.condition_number > self.max_condition:
+                warnings.warn(
+                    f'Gram matrix condition number {self.condition_number:.3g} is too large for float32, '
+                    'refitting in float64.'
+                )
+                self.dtype = np.float64
+                self.stats = sufficient_statistics(self.expand(X), y)
+
+        self.coef, self.intercept = solve_least_squares(self.stats, self.alpha)
+
+        return self
+
+    def _set_input_scaler(self, X) -> None:
+        '''
+            Center and scale each feature to unit variance before expansion.
+            A polynomial of the scaled features spans the same models, but its
+            gram matrix is far better conditioned.
+        '''
+
+        X = X[self.features].to_numpy(dtype = np.float64)
+        mean = X.mean(axis = 0)
+        std = X.std(axis = 0)
+        std[std == 0] = 1.0
+
+        self.input_scaler = {
+            feature : (-m / s, 1 / s)
+            for feature, m, s in zip(self.features, mean, std)
+        }
+
+    @property
+    def _input_min(self) -> np.ndarray:
+        return np.array([self.input_scaler[feature][0] for feature in self.features])
+
+    @property
+    def _input_scale(self) -> np.ndarray:
+        return np.array([self.input_scaler[feature][1] for feature in self.features])
+
+    def partial_fit(self, X, y) -> 'PolynomialRegression':
+        '''
+            Fold new rows into the model and refit. An unfitted model is 
+            fit on the new rows alone.
+        '''
+
+        if self.dtype == np.float32 and self.input_scaler is None:
+            self._set_input_scaler(X)
+
+        new = sufficient_statistics(self.expand(X), y)
+        self.stats = new if self.stats is None else self.stats + new
+        self.coef, self.intercept = solve_least_squares(self.stats, self.alpha)
+
+        return self
+
+    def remove(self, X, y) -> 'PolynomialRegression':
+        '''
+            Take rows that the model was fit on back out of the model and 
+            refit.
+        '''
+
+        if self.stats is None:
+            raise ValueError('The model has not been fit.')
+
+        stats = self.stats - sufficient_statistics(self.expand(X), y)
+        if stats.n <= 0:
+            raise ValueError('Cannot remove every row the model was fit on.')
+
+        self.stats = stats
+        self.coef, self.intercept = solve_least_squares(self.stats, self.alpha)
+
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        '''
+            Return the model's predictions for the features in X.
+        '''
+
+        return predict_linear(self.expand(X), self.coef.astype(self.dtype), self.intercept)
+
+################################################################################
+
+def polynomial_terms(n_features: int, degree: int = 2, interaction_only: bool = False) -> list[tuple[int]]:
+    '''
+        Return the terms of a polynomial expansion without the bias column.
+        Each term is a tuple of the feature indices multiplied together, in
+        the same order sklearn's PolynomialFeatures produces them.
+
+        Parameters
+        ----------
+        n_features: int
+            The number of input features.
+
+        degree: int, default 2
+            The maximum degree of the expansion.
+
+        interaction_only: bool, default False
+            If True only products of distinct features are produced.
+
+        Returns
+        -------
+        list[tuple[int]]: The feature indices making up each output column.
+    '''
+
+    combine = combinations if interaction_only else combinations_with_replacement
+
+    terms = []
+    for d in range(1, degree + 1):
+        terms.extend(combine(range(n_features), d))
+
+    return terms
+
+################################################################################
+
+def polynomial_powers(terms: list[tuple[int]], n_features: int) -> np.ndarray:
+    '''
+        Convert polynomial terms into a matrix of powers with one row per
+        output column and one column per input feature.
+
+        Parameters
+        ----------
+        terms: list[tuple[int]]
+            The terms returned by polynomial_terms.
+
+        n_features: int
+            The number of input features.
+
+        Returns
+        -------
+        ndarray: An integer matrix of feature powers.
+    '''
+
+    powers = np.zeros((len(terms), n_features), dtype = np.int64)
+    for i, term in enumerate(terms):
+        for j in term:
+            powers[i, j] += 1
+
+    return powers
+
+################################################################################
+
+def terms_from_powers(powers: np.ndarray) -> list[tuple[int]]:
+    '''
+        Convert a matrix of feature powers back into polynomial terms.
+
+        Parameters
+        ----------
+        powers: ndarray
+            An integer matrix of feature powers.
+
+        Returns
+        -------
+        list[tuple[int]]: The feature indices making up each output column.
+    '''
+
+    return [
+        tuple(j for j in range(powers.shape[1]) for _ in range(powers[i, j]))
+        for i in range(powers.shape[0])
+    ]
+
+################################################################################
+
+def expand_polynomial(X, terms: list[tuple[int]], dtype = np.float64) -> np.ndarray:
+    '''
+        Expand a feature matrix into polynomial terms. Each column of degree
+        d is built by multiplying an already computed column of degree d - 1
+        by one input feature, so no product is computed more than once.
+
+        Parameters
+        ----------
+        X: DataFrame | ndarray
+            The input feature matrix.
+
+        terms: list[tuple[int]]
+            The terms returned by polynomial_terms.
+
+        dtype: default np.float64
+            The floating point type of the expanded matrix.
+
+        Returns
+        -------
+        ndarray: A matrix with one column for each term.
+    '''
+
+    X = np.asarray(X, dtype = dtype)
+    X_poly = np.empty((X.shape[0], len(terms)), dtype = dtype, order = 'F')
+
+    computed = {}
+    for i, term in enumerate(terms):
+        if len(term) == 1:
+            X_poly[:, i] = X[:, term[0]]
+        else:
+            np.multiply(X_poly[:, computed[term[:-1]]], X[:, term[-1]], out = X_poly[:, i])
+
+        computed[term] = i
+
+    return X_poly
+
+################################################################################
+
+def expand_next_degree(X, block: np.ndarray, block_terms: list[tuple[int]], terms: list[tuple[int]]) -> np.ndarray:
+    '''
+        Return the columns for polynomial terms one degree higher than the
+        terms of an already expanded block, multiplying each column of the 
+        block by one input feature.
+
+        Parameters
+        ----------
+        X: DataFrame | ndarray
+            The input feature matrix.
+
+        block: ndarray
+            The expanded columns of the previous degree.
+
+        block_terms: list[tuple[int]]
+            The terms of the columns in block.
+
+        terms: list[tuple[int]]
+            The terms of the next degree. Every term with its last feature 
+            removed must be one of block_terms.
+
+        Returns
+        -------
+        ndarray: A matrix with one column for each of terms.
+    '''
+
+    X = np.asarray(X, dtype = block.dtype)
+    parents = {term : i for i, term in enumerate(block_terms)}
+
+    new_block = np.empty((X.shape[0], len(terms)), dtype = block.dtype, order = 'F')
+    for i, term in enumerate(terms):
+        np.multiply(block[:, parents[term[:-1]]], X[:, term[-1]], out = new_block[:, i])
+
+    return new_block
+
+################################################################################
+
+def sufficient_statistics(X: np.ndarray, y, weights: np.ndarray = None) -> SufficientStatistics:
+    '''
+        Compute the sufficient statistics of a least squares regression.
+
+        Parameters
+        ----------
+        X: ndarray
+            The (expanded) design matrix, without a bias column.
+
+        y: Series | ndarray
+            The target variable.
+
+        weights: ndarray, default None
+            A weight for each row, such as the number of times a row was 
+            drawn by a bootstrap resample. Rows are weighted in place of
+            being copied.
+
+        Returns
+        -------
+        SufficientStatistics: The sums needed to solve the regression.
+    '''
+
+    y = np.asarray(y, dtype = X.dtype)
+
+    # Single precision products are summed in chunks and accumulated in
+    # double precision, so the rounding error does not grow with the rows
+    if X.dtype == np.float32 and weights is None and X.shape[0] > _chunk_rows:
+        stats = None
+        for start in range(0, X.shape[0], _chunk_rows):
+            chunk = sufficient_statistics(X[start:start + _chunk_rows], y[start:start + _chunk_rows])
+            stats = chunk if stats is None else stats + chunk
+
+        return stats
+
+    if weights is not None:
+        weights = np.asarray(weights, dtype = X.dtype)
+        X_weighted = X.T * weights
+        y_weighted = y * weights
+
+        return SufficientStatistics(
+            n = float(weights.sum()),
+            x_sum = weights @ X,
+            y_sum = float(y_weighted.sum()),
+            xtx = X_weighted @ X,
+            xty = X_weighted @ y,
+            yty = float(y_weighted @ y)
+        )
+
+    return SufficientStatistics(
+        n = float(X.shape[0]),
+        x_sum = X.sum(axis = 0, dtype = np.float64),
+        y_sum = float(y.sum(dtype = np.float64)),
+        xtx = (X.T @ X).astype(np.float64),
+        xty = (X.T @ y).astype(np.float64),
+        yty = float(y @ y)
+    )
+
+################################################################################
+
+def extend_sufficient_statistics(
+    stats: SufficientStatistics,
+    blocks: list[np.ndarray],
+    X_new: np.ndarray,
+    y
+) -> SufficientStatistics:
+    '''
+        Add new columns to the sufficient statistics of a design matrix
+        without recomputing the products between the existing columns.
+
+        Parameters
+        ----------
+        stats: SufficientStatistics
+            The sufficient statistics of the existing columns, or None if 
+            there are no existing columns.
+
+        blocks: list[ndarray]
+            The existing columns, in one or more blocks.
+
+        X_new: ndarray
+            The new columns.
+
+        y: Series | ndarray
+            The target variable.
+
+        Returns
+        -------
+        SufficientStatistics: The sufficient statistics of the existing 
+            columns followed by the new columns.
+    '''
+
+    new = sufficient_statistics(X_new, y)
+    if stats is None:
+        return new
+
+    cross = np.vstack([block.T @ X_new for block in blocks])
+
+    return SufficientStatistics(
+        n = stats.n,
+        x_sum = np.concatenate([stats.x_sum, new.x_sum]),
+        y_sum = stats.y_sum,
+        xtx = np.block([[stats.xtx, cross], [cross.T, new.xtx]]),
+        xty = np.concatenate([stats.xty, new.xty]),
+        yty = stats.yty
+    )
+
+################################################################################
+
+def solve_least_squares(stats: SufficientStatistics, alpha: float = 0.0) -> tuple[np.ndarray, float]:
+    '''
+        Solve for the coefficients and intercept of a least squares regression
+        from its sufficient statistics. The problem is centered and the
+        columns are standardized before solving, which keeps the normal 
+        equations well conditioned for polynomial terms.
+
+        Parameters
+        ----------
+        stats: SufficientStatistics
+            The sufficient statistics of the training rows.
+
+        alpha: float, default 0.0
+            An L2 penalty applied to the coefficients of the standardized 
+            columns (not the intercept).
+
+        Returns
+        -------
+        tuple: The coefficient array and the intercept.
+    '''
+
+    x_mean, y_mean, sxx, sxy, scale = _standardize(stats)
+
+    if alpha:
+        sxx = sxx + alpha * np.eye(len(scale))
+
+    coef = np.linalg.lstsq(sxx, sxy, rcond = None)[0] / scale
+    intercept = float(y_mean - x_mean @ coef)
+
+    return coef, intercept
+
+################################################################################
+
+def condition_number(stats: SufficientStatistics, rcond: float = None) -> float:
+    '''
+        Return the condition number of the standardized gram matrix, which
+        bounds the relative error of the solved coefficients as a multiple 
+        of the floating point precision of the statistics.
+
+        Constant columns and columns that duplicate other columns, such as 
+        the square of a 0/1 dummy, are left out of the solution by 
+        solve_least_squares, so only the eigenvalues above rcond times the
+        largest are used.
+
+        Parameters
+        ----------
+        stats: SufficientStatistics
+            The sufficient statistics of the training rows.
+
+        rcond: float, default None
+            The relative size below which an eigenvalue counts as zero. If
+            None the number of columns times the float64 machine epsilon 
+            is used, as in np.linalg.lstsq.
+
+        Returns
+        -------
+        float: The condition number, or 1.0 if every column is constant.
+    '''
+
+    eigenvalues = np.linalg.eigvalsh(_standardize(stats)[2])
+
+    if rcond is None:
+        rcond = len(eigenvalues) * np.finfo(np.float64).eps
+
+    eigenvalues = eigenvalues[eigenvalues > rcond * eigenvalues.max(initial = 0.0)]
+    if not len(eigenvalues):
+        return 1.0
+
+    return float(eigenvalues.max() / eigenvalues.min())
+
+################################################################################
+
+def ridge_path(stats: SufficientStatistics, alphas) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        Solve a ridge regression for every alpha in a path from a single
+        eigendecomposition of the standardized gram matrix.
+
+        Parameters
+        ----------
+        stats: SufficientStatistics
+            The sufficient statistics of the training rows.
+
+        alphas: Iterable[float]
+            The L2 penalties applied to the coefficients of the standardized
+            columns.
+
+        Returns
+        -------
+        tuple: A coefficient matrix with one column for each alpha and an
+            array of intercepts.
+    '''
+
+    alphas = np.asarray(alphas, dtype = np.float64)
+    x_mean, y_mean, sxx, sxy, scale = _standardize(stats)
+
+    eigenvalues, eigenvectors = np.linalg.eigh(sxx)
+    eigenvalues = np.clip(eigenvalues, 0, None)
+
+    # Directions with no variance are dropped, as lstsq would drop them
+    shrunk = eigenvalues[:, None] + alphas[None, :]
+    cutoff = eigenvalues.max() * len(eigenvalues) * np.finfo(np.float64).eps
+    inverse = np.divide(1.0, shrunk, out = np.zeros_like(shrunk), where = shrunk > cutoff)
+
+    coefs = eigenvectors @ ((eigenvectors.T @ sxy)[:, None] * inverse) / scale[:, None]
+    intercepts = y_mean - x_mean @ coefs
+
+    return coefs, intercepts
+
+################################################################################
+
+def lasso_path(
+    stats: SufficientStatistics,
+    alphas,
+    max_iter: int = 1000,
+    tol: float = 1e-6
+) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        Solve a lasso regression for every alpha in a path by coordinate 
+        descent on the standardized gram matrix. The alphas are solved from
+        largest to smallest, each starting from the previous solution.
+
+        The objective is the same as sklearn's Lasso on standardized columns,
+        (1 / 2n) * ||y - Xb||^2 + alpha * ||b||_1.
+
+        Parameters
+        ----------
+        stats: SufficientStatistics
+            The sufficient statistics of the training rows.
+
+        alphas: Iterable[float]
+            The L1 penalties applied to the coefficients of the standardized
+            columns.
+
+        max_iter: int, default 1000
+            The most passes over the coefficients for each alpha.
+
+        tol: float, default 1e-6
+            Coordinate descent stops once no coefficient changes by more than
+            tol times the largest coefficient.
+
+        Returns
+        -------
+        tuple: A coefficient matrix with one column for each alpha, in the
+            order the alphas were given, and an array of intercepts.
+    '''
+
+    alphas = np.asarray(alphas, dtype = np.float64)
+    x_mean, y_mean, sxx, sxy, scale = _standardize(stats)
+
+    diagonal = np.diag(sxx)
+    coef = np.zeros(len(scale))
+    gradient = sxy.copy()
+    coefs = np.zeros((len(scale), len(alphas)))
+
+    for a in np.argsort(-alphas):
+        threshold = alphas[a] * stats.n
+
+        for _ in range(max_iter):
+            max_change = 0.0
+
+            for j in range(len(coef)):
+                if diagonal[j] == 0:
+                    continue
+
+                rho = gradient[j] + diagonal[j] * coef[j]
+                updated = np.sign(rho) * max(abs(rho) - threshold, 0.0) / diagonal[j]
+                change = updated - coef[j]
+
+                if change:
+                    gradient -= sxx[:, j] * change
+                    coef[j] = updated
+                    max_change = max(max_change, abs(change))
+
+            if max_change <= tol * max(np.abs(coef).max(), 1.0):
+                break
+
+        coefs[:, a] = coef
+
+    coefs = coefs / scale[:, None]
+    intercepts = y_mean - x_mean @ coefs
+
+    return coefs, intercepts
+
+################################################################################
+
+def predict_linear(X_poly: np.ndarray, coef: np.ndarray, intercept: float) -> np.ndarray:
+    '''
+        Return the predictions of a fitted linear model.
+
+        Parameters
+        ----------
+        X_poly: ndarray
+            The (expanded) design matrix, without a bias column.
+
+        coef: ndarray
+            The fitted coefficients.
+
+        intercept: float
+            The fitted intercept.
+
+        Returns
+        -------
+        ndarray: The predictions.
+    '''
+
+    return X_poly @ coef + intercept
+
+################################################################################
+
+def polynomial_names(terms: list[tuple[int]], features: list[str]) -> list[str]:
+    '''
+        Return a readable name for each polynomial term, in the style of 
+        sklearn's PolynomialFeatures, such as 'square_feet^2' or 
+        'square_feet bedroom_count'.
+
+        Parameters
+        ----------
+        terms: list[tuple[int]]
+            The terms returned by polynomial_terms.
+
+        features: list[str]
+            The names of the input features.
+
+        Returns
+        -------
+        list[str]: The name of each term.
+    '''
+
+    names = []
+    for term in terms:
+        powers = {j : term.count(j) for j in sorted(set(term))}
+        names.append(' '.join(
+            features[j] if power == 1 else f'{features[j]}^{power}'
+            for j, power in powers.items()
+        ))
+
+    return names
+
+################################################################################
+
+def _standardize(stats: SufficientStatistics) -> tuple:
+    '''
+        Return the means, the centered gram matrix and cross product of the
+        standardized columns, and the standard deviation of each column.
+    '''
+
+    x_mean = stats.x_sum / stats.n
+    y_mean = stats.y_sum / stats.n
+
+    sxx = stats.xtx - stats.n * np.outer(x_mean, x_mean)
+    sxy = stats.xty - stats.n * x_mean * y_mean
+
+    scale = np.sqrt(np.clip(np.diag(sxx), 0, None) / stats.n)
+    scale[scale == 0] = 1.0
+
+    return x_mean, y_mean, sxx / np.outer(scale, scale), sxy / scale, scale
@@ -9,38 +9,78 @@
 #
 #       Variables:
 #
-#           None
+#           _county_columns
+#           _county_features
+#
+#       Classes:
+#
+#           SGDPolynomialRegressor
 #
 #       Functions:
 #
-#           establish_baseline(target)
-#           produce_models(X_train, y_train, X_validate, y_validate)
-#           model(X_train, y_train, X_validate, y_validate, columns)
-#           produce_models_for_each_county(train, validate)
+#           establish_baseline(target, groups)
+#           produce_models(X_train, y_train, X_validate, y_validate, reports)
+#           model(X_train, y_train, X_validate, y_validate, columns, degree)
+#           produce_boosting_models(X_train, y_train, X_validate, y_validate, feature_sets, reports, **params)
+#           boosting_model(X_train, y_train, X_validate, y_validate, columns, **params)
+#           comparables_model(X_train, y_train, X_validate, y_validate, k)
+#           produce_models_for_each_county(train, validate, mode)
 #           county_model(train, validate, mask)
+#           county_interaction_model(train, validate, mode, degree)
+#           _county_design(train, mode, degree)
+#           _county_codes(df)
+#           cross_validate_models(X, y, feature_sets, k, degree, random_seed, n_jobs)
+#           cross_validate(X, y, columns, k, degree, random_seed, n_jobs)
+#           degree_sweep(X_train, y_train, X_validate, y_validate, columns, max_degree, interaction_only)
+#           regularization_path(X_train, y_train, X_validate, y_validate, columns, alphas, degree, method)
+#           run_experiments(X_train, y_train, X_validate, y_validate, experiments, registry, imputer, scaler)
+#           bootstrap_model(X_train, y_train, columns, X_new, degree, n_replicates, confidence, random_seed, n_jobs)
+#           _bootstrap_replicates(seed, n_replicates)
+#           compare_float32(X_train, y_train, X_validate, y_validate, columns, degree)
+#           _path_rmse(X_poly, y, coefs, intercepts)
+#           _predict_blocks(blocks, coef, intercept)
+#           _kfold_order(n, k, random_seed)
+#           _fold_scores(fold_X, fold_y, fold_stats, total, i)
 #
 #
 ################################################################################
 
+import time
+
+import numpy as np
 import pandas as pd
 
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import PolynomialFeatures
 from sklearn.model_selection import train_test_split
 
-from util.evaluate import _RMSE
+from util.artifact import data_fingerprint
+from util.boosting import HistogramGradientBoosting
+from util.spatial import ComparableSalesEstimator
+from util.evaluate import _RMSE, ConstantBaseline
+from util.linear import polynomial_terms, expand_polynomial, expand_next_degree, \
+    sufficient_statistics, extend_sufficient_statistics, solve_least_squares, predict_linear, \
+    ridge_path, lasso_path, polynomial_names, SufficientStatistics, PolynomialRegression
+from util.parallel import worker_pool, worker_data, batch_seeds, resample_counts
+from util.registry import ResultRegistry, ReportStore
 
 ################################################################################
 
-def establish_baseline(target: pd.DataFrame) -> pd.Series:
+def establish_baseline(target: pd.DataFrame, groups = None) -> pd.Series:
     '''
         Determine whether to use the mean of the target or the median of the 
-        target as the baseline model for a regression problem.
+        target as the baseline model for a regression problem. The choice is
+        made from summary statistics of the target with ConstantBaseline, 
+        which can also score the baseline without building this Series.
     
         Parameters
         ----------
         target: DataFrame
             The target variable for a regression problem.
+
+        groups: Series, default None
+            The group of each row, for example the county, to use a separate
+            mean or median for each group.
     
         Returns
         -------
@@ -48,45 +88,57 @@ def establish_baseline(target: pd.DataFrame) -> pd.Series:
             median and mean of the target variable.
     '''
 
-    baseline = pd.DataFrame({
-        'median' : [target.median()] * target.size,
-        'mean' : [target.mean()] * target.size
-    })
+    baseline = ConstantBaseline('best').fit(target, groups)
+    predictions = baseline.predict(groups) if groups is not None else baseline.predict(n = len(target))
 
-    median_rmse = _RMSE(target, baseline["median"])
-    mean_rmse = _RMSE(target, baseline["mean"])
-
-    return baseline['median'] if median_rmse < mean_rmse else baseline['mean']
+    return pd.Series(predictions, name = baseline.statistic_)
 
 ################################################################################
 
-def produce_models(X_train, y_train, X_validate, y_validate):
+def produce_models(X_train, y_train, X_validate, y_validate, reports: ReportStore = None):
+    if reports is not None:
+        run = reports.new_run()
+        fingerprint = data_fingerprint(X_train, y_train) + data_fingerprint(X_validate, y_validate)
+
     results = {}
 
+    began = time.perf_counter()
+    baseline = ConstantBaseline('best').fit(y_train)
     results['Baseline'] = {
-        'RMSE_train' : round(_RMSE(y_train, establish_baseline(y_train)), 0)
+        'RMSE_train' : round(baseline.score().RMSE, 0)
     }
 
-    features = ['square_feet', 'bedroom_count', 'bathroom_count']
-    train_pred, validate_pred = model(X_train, y_train, X_validate, y_validate, features)
-    results['Model_1'] = {
-        'RMSE_train' : round(_RMSE(y_train, train_pred), 0),
-        'RMSE_validate' : round(_RMSE(y_validate, validate_pred), 0)
-    }
+    if reports is not None:
+        seconds = time.perf_counter() - began
+        reports.record(run, 'Baseline', 'train', baseline.score(), len(y_train), seconds, fingerprint)
+        reports.record(run, 'Baseline', 'validate', baseline.score(y_validate), len(y_validate), seconds, fingerprint)
 
-    features = ['square_feet', 'bedroom_count', 'bathroom_count', 'amenities']
-    train_pred, validate_pred = model(X_train, y_train, X_validate, y_validate, features)
-    results['Model_2'] = {
-        'RMSE_train' : round(_RMSE(y_train, train_pred), 0),
-        'RMSE_validate' : round(_RMSE(y_validate, validate_pred), 0)
+    feature_sets = {
+        'Model_1' : ['square_feet', 'bedroom_count', 'bathroom_count'],
+        'Model_2' : ['square_feet', 'bedroom_count', 'bathroom_count', 'amenities']
     }
 
+    for name, features in feature_sets.items():
+        began = time.perf_counter()
+        train_pred, validate_pred = model(X_train, y_train, X_validate, y_validate, features)
+        seconds = time.perf_counter() - began
+
+        results[name] = {
+            'RMSE_train' : round(_RMSE(y_train, train_pred), 0),
+            'RMSE_validate' : round(_RMSE(y_validate, validate_pred), 0)
+        }
+
+        if reports is not None:
+            params = {'features' : features, 'degree' : 2}
+            reports.score(run, name, 'train', y_train, train_pred, seconds, fingerprint, params)
+            reports.score(run, name, 'validate', y_validate, validate_pred, seconds, fingerprint, params)
+
     return results
 
 ################################################################################
 
-def model(X_train, y_train, X_validate, y_validate, columns):
-    poly = PolynomialFeatures(degree = 2, include_bias = False, interaction_only = False)
+def model(X_train, y_train, X_validate, y_validate, columns, degree = 2):
+    poly = PolynomialFeatures(degree = degree, include_bias = False, interaction_only = False)
     poly.fit(X_train[columns])
 
     X_train_poly = pd.DataFrame(
@@ -98,7 +150,7 @@ def model(X_train, y_train, X_validate, y_validate, columns):
     model = LinearRegression()
     model.fit(X_train_poly, y_train)
 
-    poly = PolynomialFeatures(degree = 2, include_bias = False, interaction_only = False)
+    poly = PolynomialFeatures(degree = degree, include_bias = False, interaction_only = False)
     poly.fit(X_validate[columns])
 
     X_validate_poly = pd.DataFrame(
@@ -111,7 +163,134 @@ def model(X_train, y_train, X_validate, y_validate, columns):
 
 ################################################################################
 
-def produce_models_for_each_county(train, validate):
+def produce_boosting_models(X_train, y_train, X_validate, y_validate, feature_sets = None, reports: ReportStore = None, **params):
+    '''
+        Fit histogram gradient boosting models and return their scores in the
+        same format as produce_models.
+    
+        Parameters
+        ----------
+        X_train: DataFrame
+            The training features for a regression problem.
+
+        y_train: Series
+            The training target for a regression problem.
+
+        X_validate: DataFrame
+            The validate features for a regression problem.
+
+        y_validate: Series
+            The validate target for a regression problem.
+
+        feature_sets: dict[str, list[str]], default None
+            A mapping of model names to the feature columns each model uses.
+            If None a model on the produce_models features and a model on 
+            every feature are fit.
+
+        reports: ReportStore, default None
+            If given, the metrics, timing, and row counts of every model on
+            both splits are stored in it as a new run.
+
+        **params:
+            Parameters passed to HistogramGradientBoosting.
+
+        Returns
+        -------
+        dict: A dictionary of train and validate RMSE scores for the 
+            baseline and each model.
+    '''
+
+    if feature_sets is None:
+        feature_sets = {
+            'Boosting_1' : ['square_feet', 'bedroom_count', 'bathroom_count', 'amenities'],
+            'Boosting_2' : [
+                'square_feet', 'bedroom_count', 'bathroom_count', 'amenities', 'building_quality',
+                'property_age', 'lotsizesquarefeet', 'fed_code_6037', 'fed_code_6059', 'fed_code_6111'
+            ]
+        }
+
+    if reports is not None:
+        run = reports.new_run()
+        fingerprint = data_fingerprint(X_train, y_train) + data_fingerprint(X_validate, y_validate)
+
+    results = {}
+
+    began = time.perf_counter()
+    baseline = ConstantBaseline('best').fit(y_train)
+    results['Baseline'] = {
+        'RMSE_train' : round(baseline.score().RMSE, 0)
+    }
+
+    if reports is not None:
+        seconds = time.perf_counter() - began
+        reports.record(run, 'Baseline', 'train', baseline.score(), len(y_train), seconds, fingerprint)
+        reports.record(run, 'Baseline', 'validate', baseline.score(y_validate), len(y_validate), seconds, fingerprint)
+
+    for name, features in feature_sets.items():
+        began = time.perf_counter()
+        train_pred, validate_pred = boosting_model(X_train, y_train, X_validate, y_validate, features, **params)
+        seconds = time.perf_counter() - began
+
+        results[name] = {
+            'RMSE_train' : round(_RMSE(y_train, train_pred), 0),
+            'RMSE_validate' : round(_RMSE(y_validate, validate_pred), 0)
+        }
+
+        if reports is not None:
+            report_params = {'features' : features, **params}
+            reports.score(run, name, 'train', y_train, train_pred, seconds, fingerprint, report_params)
+            reports.score(run, name, 'validate', y_validate, validate_pred, seconds, fingerprint, report_params)
+
+    return results
+
+################################################################################
+
+def boosting_model(X_train, y_train, X_validate, y_validate, columns, **params):
+    boosting = HistogramGradientBoosting(columns, **params)
+    boosting.fit(X_train, y_train)
+
+    return boosting.predict(X_train), boosting.predict(X_validate)
+
+################################################################################
+
+def comparables_model(X_train, y_train, X_validate, y_validate, k = 10):
+    estimator = ComparableSalesEstimator(k)
+    estimator.fit(X_train, y_train)
+
+    return estimator.predict(X_train, exclude_self = True), estimator.predict(X_validate)
+
+################################################################################
+
+_county_columns = {
+    'Los_Angeles_County' : 'fed_code_6037',
+    'Orange_County' : 'fed_code_6059',
+    'Ventura_County' : 'fed_code_6111'
+}
+
+_county_features = ['square_feet', 'bedroom_count', 'bathroom_count', 'amenities']
+
+################################################################################
+
+def produce_models_for_each_county(train, validate, mode = None):
+    if mode is not None:
+        train_pred, validate_pred = county_interaction_model(train, validate, mode)
+
+        results = {}
+        for county, column in _county_columns.items():
+            train_mask = (train[column] == 1).to_numpy()
+            validate_mask = (validate[column] == 1).to_numpy()
+            results[county] = {
+                'RMSE_train' : round(_RMSE(train.property_tax_assessed_values[train_mask], train_pred[train_mask]), 0),
+                'RMSE_validate' : round(_RMSE(validate.property_tax_assessed_values[validate_mask], validate_pred[validate_mask]), 0)
+            }
+
+        results['All_Counties'] = {
+            'RMSE_train' : round(_RMSE(train.property_tax_assessed_values, train_pred), 0),
+            'RMSE_validate' : round(_RMSE(validate.property_tax_assessed_values, validate_pred), 0)
+        }
+
+        return results
+
     los_angeles_county = lambda df: df.fed_code_6037 == 1
     orange_county = lambda df: df.fed_code_6059 == 1
     ventura_county = lambda df: df.fed_code_6111 == 1
@@ -176,4 +355,1032 @@ def county_model(train, validate, mask):
         index = X_validate.index
     )
 
-    return model.predict(X_train_poly), model.predict(X_validate_poly)
\ No newline at end of file
+    return model.predict(X_train_poly), model.predict(X_validate_poly)
+
+################################################################################
+
+def county_interaction_model(
+    train: pd.DataFrame,
+    validate: pd.DataFrame,
+    mode: str = 'separate',
+    degree: int = 2
+) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        Fit the county models with a single solve and return predictions for
+        every row of train and validate.
+
+        County is encoded as block interactions in one design matrix. Rows
+        are sorted by county once, the sufficient statistics of each county
+        are computed from contiguous slices, and the statistics of the block
+        design are assembled from them without building the block matrix.
+    
+        Parameters
+        ----------
+        train: DataFrame
+            The prepared zillow training dataset.
+
+        validate: DataFrame
+            The prepared zillow validate dataset.
+
+        mode: str, default 'separate'
+            'separate' fits a separate intercept and separate slopes for 
+            each county, which matches fitting each county on its own. 
+            'shared_slopes' fits a separate intercept for each county with
+            slopes shared by all counties. 'pooled' fits one model for all 
+            counties.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        Returns
+        -------
+        tuple: Arrays of predictions for train and validate, in the order of
+            their rows.
+    '''
+
+    if mode not in ('separate', 'shared_slopes', 'pooled'):
+        raise ValueError(f"mode must be 'separate', 'shared_slopes', or 'pooled', not {mode!r}")
+
+    coef, intercept, positions = _county_design(train, mode, degree)
+
+    terms = polynomial_terms(len(_county_features), degree)
+
+    predictions = []
+    for df in (train, validate):
+        X_poly = expand_polynomial(df[_county_features], terms)
+        counties = _county_codes(df)
+
+        pred = np.empty(len(df))
+        for c, (dummy, block) in enumerate(positions):
+            rows = counties == c
+            pred[rows] = X_poly[rows] @ coef[block] + intercept + (coef[dummy] if dummy is not None else 0.0)
+
+        predictions.append(pred)
+
+    return predictions[0], predictions[1]
+
+################################################################################
+
+def _county_design(train: pd.DataFrame, mode: str, degree: int) -> tuple:
+    '''
+        Solve the county block design and return its coefficients, its 
+        intercept, and for each county the position of its intercept dummy
+        (None for the reference county) and of its slope coefficients.
+    '''
+
+    terms = polynomial_terms(len(_county_features), degree)
+    n_terms = len(terms)
+    n_counties = len(_county_columns)
+
+    counties = _county_codes(train)
+    order = np.argsort(counties, kind = 'stable')
+    bounds = np.searchsorted(counties[order], np.arange(n_counties + 1))
+
+    X_poly = expand_polynomial(train[_county_features].to_numpy()[order], terms)
+    y = np.asarray(train.property_tax_assessed_values, dtype = np.float64)[order]
+
+    n_dummies = 0 if mode == 'pooled' else n_counties - 1
+    n_blocks = n_counties if mode == 'separate' else 1
+    size = n_dummies + n_blocks * n_terms
+
+    positions = []
+    for c in range(n_counties):
+        dummy = c - 1 if n_dummies and c > 0 else None
+        start = n_dummies + (c if mode == 'separate' else 0) * n_terms
+        positions.append((dummy, np.arange(start, start + n_terms)))
+
+    stats = SufficientStatistics(
+        n = 0.0,
+        x_sum = np.zeros(size),
+        y_sum = 0.0,
+        xtx = np.zeros((size, size)),
+        xty = np.zeros(size),
+        yty = 0.0
+    )
+
+    for c, (dummy, block) in enumerate(positions):
+        county = sufficient_statistics(X_poly[bounds[c]:bounds[c + 1]], y[bounds[c]:bounds[c + 1]])
+
+        stats.n += county.n
+        stats.y_sum += county.y_sum
+        stats.yty += county.yty
+        stats.x_sum[block] += county.x_sum
+        stats.xty[block] += county.xty
+        stats.xtx[np.ix_(block, block)] += county.xtx
+
+        if dummy is not None:
+            stats.x_sum[dummy] += county.n
+            stats.xty[dummy] += county.y_sum
+            stats.xtx[dummy, dummy] += county.n
+            stats.xtx[dummy, block] += county.x_sum
+            stats.xtx[block, dummy] += county.x_sum
+
+    coef, intercept = solve_least_squares(stats)
+
+    return coef, intercept, positions
+
+################################################################################
+
+def _county_codes(df: pd.DataFrame) -> np.ndarray:
+    '''
+        Return the position of each row's county in _county_columns. Every 
+        row must have exactly one county dummy set.
+    '''
+
+    dummies = df[list(_county_columns.values())].to_numpy()
+
+    unassigned = dummies.sum(axis = 1) != 1
+    if unassigned.any():
+        raise ValueError(
+            f'{np.count_nonzero(unassigned)} rows do not have exactly one of the county columns '
+            f'{list(_county_columns.values())} set'
+        )
+
+    return np.argmax(dummies, axis = 1)
+
+################################################################################
+
+def cross_validate_models(
+    X: pd.DataFrame,
+    y: pd.Series,
+    feature_sets: dict[str, list[str]] = None,
+    k: int = 5,
+    degree: int = 2,
+    random_seed: int = 24,
+    n_jobs: int = 1
+) -> dict:
+    '''
+        Score several polynomial regression models with k-fold cross 
+        validation and return the results in the same format as 
+        produce_models.
+
+        Parameters
+        ----------
+        X: DataFrame
+            The features for a regression problem.
+
+        y: Series
+            The target variable for a regression problem.
+
+        feature_sets: dict[str, list[str]], default None
+            A mapping of model names to the feature columns each model uses.
+            If None the feature sets from produce_models are used.
+
+        k: int, default 5
+            The number of folds.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        random_seed: int, default 24
+            The random seed used to assign rows to folds.
+
+        n_jobs: int, default 1
+            The number of models scored in parallel, -1 for all cores.
+
+        Returns
+        -------
+        dict: A dictionary of mean train and validate RMSE scores for each 
+            model.
+    '''
+
+    if feature_sets is None:
+        feature_sets = {
+            'Model_1' : ['square_feet', 'bedroom_count', 'bathroom_count'],
+            'Model_2' : ['square_feet', 'bedroom_count', 'bathroom_count', 'amenities']
+        }
+
+    # Numpy releases the GIL for the linear algebra, so threads avoid
+    # copying the data into other processes
+    with worker_pool(n_jobs, threads = True) as map_models:
+        scores = list(map_models(
+            lambda columns: cross_validate(X, y, columns, k, degree, random_seed),
+            feature_sets.values()
+        ))
+
+    return {
+        name : {
+            'RMSE_train' : round(score['RMSE_train'], 0),
+            'RMSE_validate' : round(score['RMSE_validate'], 0)
+        }
+        for name, score in zip(feature_sets, scores)
+    }
+
+################################################################################
+
+def cross_validate(
+    X: pd.DataFrame,
+    y: pd.Series,
+    columns: list[str],
+    k: int = 5,
+    degree: int = 2,
+    random_seed: int = 24,
+    n_jobs: int = 1
+) -> dict:
+    '''
+        Score a polynomial regression model with k-fold cross validation.
+
+        The polynomial expansion and the sufficient statistics of each fold 
+        are computed once. The training statistics for a fold are the total
+        statistics minus the statistics of the held out fold, so each fold 
+        only costs a small solve and a pass over the data for its errors.
+    
+        Parameters
+        ----------
+        X: DataFrame
+            The features for a regression problem.
+
+        y: Series
+            The target variable for a regression problem.
+
+        columns: list[str]
+            The feature columns used by the model.
+
+        k: int, default 5
+            The number of folds.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        random_seed: int, default 24
+            The random seed used to assign rows to folds.
+
+        n_jobs: int, default 1
+            The number of folds scored in parallel, -1 for all cores.
+
+        Returns
+        -------
+        dict: The mean train and validate RMSE across the folds.
+    '''
+
+    order, bounds = _kfold_order(len(y), k, random_seed)
+
+    X_poly = expand_polynomial(X[columns].to_numpy()[order], polynomial_terms(len(columns), degree))
+    y = np.asarray(y, dtype = np.float64)[order]
+
+    fold_X = [X_poly[start:stop] for start, stop in bounds]
+    fold_y = [y[start:stop] for start, stop in bounds]
+    fold_stats = [sufficient_statistics(X_f, y_f) for X_f, y_f in zip(fold_X, fold_y)]
+
+    total = fold_stats[0]
+    for stats in fold_stats[1:]:
+        total = total + stats
+
+    with worker_pool(n_jobs, threads = True) as map_folds:
+        scores = list(map_folds(lambda i: _fold_scores(fold_X, fold_y, fold_stats, total, i), range(k)))
+
+    return {
+        'RMSE_train' : float(np.mean([train for train, _ in scores])),
+        'RMSE_validate' : float(np.mean([validate for _, validate in scores]))
+    }
+
+################################################################################
+
+def degree_sweep(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_validate: pd.DataFrame,
+    y_validate: pd.Series,
+    columns: list[str],
+    max_degree: int = 4,
+    interaction_only: bool = False
+) -> dict:
+    '''
+        Fit polynomial regression models of degree 1 through max_degree and 
+        return their scores along with what each degree cost to fit.
+
+        The columns of each degree are built from the cached columns of the
+        degree below, and the sufficient statistics are extended with only
+        the products that involve the new columns.
+    
+        Parameters
+        ----------
+        X_train: DataFrame
+            The training features for a regression problem.
+
+        y_train: Series
+            The training target for a regression problem.
+
+        X_validate: DataFrame
+            The validate features for a regression problem.
+
+        y_validate: Series
+            The validate target for a regression problem.
+
+        columns: list[str]
+            The feature columns used by the models.
+
+        max_degree: int, default 4
+            The highest degree to fit.
+
+        interaction_only: bool, default False
+            If True only products of distinct features are used.
+
+        Returns
+        -------
+        dict: A dictionary with the number of terms, the train and validate 
+            RMSE, the seconds spent fitting, and the megabytes held by the
+            expanded train and validate matrices for each degree.
+    '''
+
+    X_train = X_train[columns].to_numpy(dtype = np.float64)
+    X_validate = X_validate[columns].to_numpy(dtype = np.float64)
+    y_train = np.asarray(y_train, dtype = np.float64)
+    y_validate = np.asarray(y_validate, dtype = np.float64)
+
+    all_terms = polynomial_terms(len(columns), max_degree, interaction_only)
+
+    train_blocks, validate_blocks = [], []
+    block_terms = None
+    stats = None
+    results = {}
+
+    for degree in range(1, max_degree + 1):
+        terms = [term for term in all_terms if len(term) == degree]
+        if not terms:
+            break
+
+        start = time.perf_counter()
+
+        if block_terms is None:
+            train_block = expand_polynomial(X_train, terms)
+            validate_block = expand_polynomial(X_validate, terms)
+        else:
+            train_block = expand_next_degree(X_train, train_blocks[-1], block_terms, terms)
+            validate_block = expand_next_degree(X_validate, validate_blocks[-1], block_terms, terms)
+
+        stats = extend_sufficient_statistics(stats, train_blocks, train_block, y_train)
+        train_blocks.append(train_block)
+        validate_blocks.append(validate_block)
+        block_terms = terms
+
+        coef, intercept = solve_least_squares(stats)
+
+        seconds = time.perf_counter() - start
+
+        train_pred = _predict_blocks(train_blocks, coef, intercept)
+        validate_pred = _predict_blocks(validate_blocks, coef, intercept)
+
+        results[f'Degree_{degree}'] = {
+            'n_terms' : len(coef),
+            'RMSE_train' : round(_RMSE(y_train, train_pred), 0),
+            'RMSE_validate' : round(_RMSE(y_validate, validate_pred), 0),
+            'fit_seconds' : seconds,
+            'memory_mb' : sum(block.nbytes for block in train_blocks + validate_blocks) / 1e6
+        }
+
+    return results
+
+################################################################################
+
+def regularization_path(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_validate: pd.DataFrame,
+    y_validate: pd.Series,
+    columns: list[str],
+    alphas: list[float] = (0.01, 0.1, 1.0, 10.0, 100.0, 1000.0),
+    degree: int = 2,
+    method: str = 'ridge'
+) -> dict:
+    '''
+        Fit a regularized polynomial regression for every alpha in a path and
+        return the results in the same format as produce_models. The data is
+        expanded and reduced to sufficient statistics once for the whole
+        path, and ridge solves every alpha from one eigendecomposition.
+    
+        Parameters
+        ----------
+        X_train: DataFrame
+            The training features for a regression problem.
+
+        y_train: Series
+            The training target for a regression problem.
+
+        X_validate: DataFrame
+            The validate features for a regression problem.
+
+        y_validate: Series
+            The validate target for a regression problem.
+
+        columns: list[str]
+            The feature columns used by the models.
+
+        alphas: list[float], default (0.01, 0.1, 1.0, 10.0, 100.0, 1000.0)
+            The penalties applied to the coefficients of the standardized
+            polynomial terms.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        method: str, default 'ridge'
+            Either 'ridge' for an L2 penalty or 'lasso' for an L1 penalty 
+            solved by coordinate descent with warm starts.
+
+        Returns
+        -------
+        dict: A dictionary of train and validate RMSE scores for each alpha.
+    '''
+
+    if method not in ('ridge', 'lasso'):
+        raise ValueError(f"method must be 'ridge' or 'lasso', not {method!r}")
+
+    terms = polynomial_terms(len(columns), degree)
+    X_train_poly = expand_polynomial(X_train[columns], terms)
+    X_validate_poly = expand_polynomial(X_validate[columns], terms)
+
+    stats = sufficient_statistics(X_train_poly, y_train)
+    path = ridge_path if method == 'ridge' else lasso_path
+    coefs, intercepts = path(stats, alphas)
+
+    rmse_train = _path_rmse(X_train_poly, y_train, coefs, intercepts)
+    rmse_validate = _path_rmse(X_validate_poly, y_validate, coefs, intercepts)
+
+    return {
+        f'{method.title()}_{float(alpha):g}' : {
+            'RMSE_train' : round(float(train), 0),
+            'RMSE_validate' : round(float(validate), 0)
+        }
+        for alpha, train, validate in zip(alphas, rmse_train, rmse_validate)
+    }
+
+################################################################################
+
+def run_experiments(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_validate: pd.DataFrame,
+    y_validate: pd.Series,
+    experiments: dict[str, dict],
+    registry: ResultRegistry = None,
+    imputer: dict[str, float] = None,
+    scaler = None
+) -> dict:
+    '''
+        Fit and score a set of polynomial regression experiments and return 
+        the results in the same format as produce_models. When a registry is
+        given, experiments it has already scored on the same data with the
+        same code are served from it, and new results and model artifacts 
+        are stored in it.
+    
+        Parameters
+        ----------
+        X_train: DataFrame
+            The training features for a regression problem.
+
+        y_train: Series
+            The training target for a regression problem.
+
+        X_validate: DataFrame
+            The validate features for a regression problem.
+
+        y_validate: Series
+            The validate target for a regression problem.
+
+        experiments: dict[str, dict]
+            A mapping of experiment names to their configuration. Each
+            configuration holds 'columns' and optionally 'degree' (default 
+            2), 'interaction_only' (default False) and 'alpha' (default 0.0).
+
+        registry: ResultRegistry, default None
+            The registry used to skip experiments that were already scored.
+
+        imputer: dict[str, float], default None
+            The missing value fills used to prepare the data, from 
+            util.prepare.get_fill_values, saved with each model artifact.
+
+        scaler: MinMaxScaler | dict[str, tuple[float, float]], default None
+            The scaler used to prepare the data, saved with each model 
+            artifact.
+
+        Returns
+        -------
+        dict: A dictionary of train and validate RMSE scores for each 
+            experiment.
+    '''
+
+    if registry is not None:
+        fingerprint = data_fingerprint(X_train, y_train) + data_fingerprint(X_validate, y_validate)
+
+    results = {}
+    for name, experiment in experiments.items():
+        columns = experiment['columns']
+        degree = experiment.get('degree', 2)
+        params = {
+            'interaction_only' : experiment.get('interaction_only', False),
+            'alpha' : experiment.get('alpha', 0.0)
+        }
+
+        if registry is not None:
+            key = registry.key(fingerprint, columns, degree, 'PolynomialRegression', params)
+            stored = registry.get(key)
+            if stored is not None:
+                results[name] = stored['metrics']
+                continue
+
+        fitted = PolynomialRegression(columns, degree, **params).fit(X_train, y_train)
+        results[name] = {
+            'RMSE_train' : round(_RMSE(y_train, fitted.predict(X_train)), 0),
+            'RMSE_validate' : round(_RMSE(y_validate, fitted.predict(X_validate)), 0)
+        }
+
+        if registry is not None:
+            artifact = registry.save_artifact(key, fitted, imputer, scaler, fingerprint)
+            registry.put(key, results[name], fingerprint, columns, degree, 'PolynomialRegression', params, artifact)
+
+    return results
+
+################################################################################
+
+def bootstrap_model(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    columns: list[str],
+    X_new: pd.DataFrame = None,
+    degree: int = 2,
+    n_replicates: int = 1000,
+    confidence: float = 0.95,
+    random_seed: int = 24,
+    n_jobs: int = 1
+) -> dict:
+    '''
+        Bootstrap a polynomial regression model to get confidence bands for
+        its coefficients and prediction intervals for new rows.
+
+        Each replicate is refit from sufficient statistics weighted by how
+        many times each row was drawn, so rows are never copied. Replicates
+        are drawn in batches of index matrices, and the batches can be 
+        spread across processes that each receive the data once.
+    
+        Parameters
+        ----------
+        X_train: DataFrame
+            The training features for a regression problem.
+
+        y_train: Series
+            The training target for a regression problem.
+
+        columns: list[str]
+            The feature columns used by the model.
+
+        X_new: DataFrame, default None
+            Rows to produce prediction intervals for.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        n_replicates: int, default 1000
+            The number of bootstrap replicates.
+
+        confidence: float, default 0.95
+            The confidence level of the intervals.
+
+        random_seed: int, default 24
+            The random seed used to draw the resamples.
+
+        n_jobs: int, default 1
+            The number of processes used to fit the replicates, -1 for
+            all cores.
+
+        Returns
+        -------
+        dict: A 'coefficients' DataFrame with the estimate and the lower and
+            upper bounds for the intercept and each term, and, if X_new is 
+            given, a 'predictions' DataFrame with the prediction and the 
+            lower and upper bounds of its prediction interval.
+    '''
+
+    terms = polynomial_terms(len(columns), degree)
+    X_poly = expand_polynomial(X_train[columns], terms)
+    y = np.asarray(y_train, dtype = np.float64)
+
+    coef, intercept = solve_least_squares(sufficient_statistics(X_poly, y))
+
+    # Keep each batch's index matrix to roughly 10 million entries
+    batch_size = max(1, min(64, 10_000_000 // len(y)))
+    sizes, seeds = batch_seeds(n_replicates, batch_size, random_seed, extra = 1)
+
+    with worker_pool(n_jobs, X_poly = X_poly, y = y) as map_batches:
+        batches = list(map_batches(_bootstrap_replicates, seeds[:-1], sizes))
+
+    coefs = np.vstack([batch_coefs for batch_coefs, _ in batches])
+    intercepts = np.concatenate([batch_intercepts for _, batch_intercepts in batches])
+
+    tail = (1 - confidence) / 2 * 100
+    results = {
+        'coefficients' : pd.DataFrame({
+            'estimate' : np.concatenate([[intercept], coef]),
+            'lower' : np.percentile(np.column_stack([intercepts, coefs]), tail, axis = 0),
+            'upper' : np.percentile(np.column_stack([intercepts, coefs]), 100 - tail, axis = 0)
+        }, index = ['intercept'] + polynomial_names(terms, columns))
+    }
+
+    if X_new is not None:
+        X_new_poly = expand_polynomial(X_new[columns], terms)
+        residuals = y - predict_linear(X_poly, coef, intercept)
+        rng = np.random.default_rng(seeds[-1])
+
+        lower = np.empty(len(X_new_poly))
+        upper = np.empty(len(X_new_poly))
+
+        # Add a resampled residual to each replicate's prediction, in chunks
+        # of rows so the replicate matrix stays small
+        chunk = max(1, 20_000_000 // n_replicates)
+        for start in range(0, len(X_new_poly), chunk):
+            stop = start + chunk
+            replicates = X_new_poly[start:stop] @ coefs.T + intercepts
+            replicates += residuals[rng.integers(0, len(residuals), replicates.shape)]
+            lower[start:stop], upper[start:stop] = np.percentile(replicates, [tail, 100 - tail], axis = 1)
+
+        results['predictions'] = pd.DataFrame({
+            'prediction' : predict_linear(X_new_poly, coef, intercept),
+            'lower' : lower,
+            'upper' : upper
+        }, index = X_new.index)
+
+    return results
+
+################################################################################
+
+def _bootstrap_replicates(seed: np.random.SeedSequence, n_replicates: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        Draw a batch of resamples as one index matrix and refit a model for
+        each from weighted sufficient statistics.
+    '''
+
+    X_poly = worker_data()['X_poly']
+    y = worker_data()['y']
+
+    weights = resample_counts(seed, n_replicates, len(y))
+
+    coefs = np.empty((n_replicates, X_poly.shape[1]))
+    intercepts = np.empty(n_replicates)
+    for b in range(n_replicates):
+        coefs[b], intercepts[b] = solve_least_squares(sufficient_statistics(X_poly, y, weights[b]))
+
+    return coefs, intercepts
+
+################################################################################
+
+def compare_float32(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    X_validate: pd.DataFrame,
+    y_validate: pd.Series,
+    columns: list[str],
+    degree: int = 2
+) -> dict:
+    '''
+        Fit the same polynomial regression in float64 and float32 and return
+        their scores, fit times, and the memory of their expanded training
+        matrices, with the change in RMSE the float32 path causes.
+    
+        Parameters
+        ----------
+        X_train: DataFrame
+            The training features for a regression problem.
+
+        y_train: Series
+            The training target for a regression problem.
+
+        X_validate: DataFrame
+            The validate features for a regression problem.
+
+        y_validate: Series
+            The validate target for a regression problem.
+
+        columns: list[str]
+            The feature columns used by the model.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        Returns
+        -------
+        dict: A dictionary with a 'Float64' and a 'Float32' entry. The 
+            float32 entry also holds the dtype it actually used after any
+            fallback, the condition number of its gram matrix, and its RMSE
+            deltas against float64.
+    '''
+
+    results = {}
+    for name, dtype in (('Float64', np.float64), ('Float32', np.float32)):
+        start = time.perf_counter()
+        fitted = PolynomialRegression(columns, degree, dtype = dtype).fit(X_train, y_train)
+        seconds = time.perf_counter() - start
+
+        results[name] = {
+            'RMSE_train' : _RMSE(y_train, fitted.predict(X_train)),
+            'RMSE_validate' : _RMSE(y_validate, fitted.predict(X_validate)),
+            'fit_seconds' : seconds,
+            'memory_mb' : len(X_train) * len(fitted.coef) * np.dtype(fitted.dtype).itemsize / 1e6
+        }
+
+    results['Float32']['dtype_used'] = np.dtype(fitted.dtype).name
+    results['Float32']['condition_number'] = fitted.condition_number
+    results['Float32']['RMSE_train_delta'] = results['Float32']['RMSE_train'] - results['Float64']['RMSE_train']
+    results['Float32']['RMSE_validate_delta'] = results['Float32']['RMSE_validate'] - results['Float64']['RMSE_validate']
+
+    return results
+
+################################################################################
+
+class SGDPolynomialRegressor:
+    '''
+        A polynomial regression trained by mini-batch stochastic gradient 
+        descent on a stream of prepared data chunks. Each chunk is expanded 
+        on its own, so the memory used depends on the chunk size and not on
+        the number of rows.
+
+        The inputs, the expanded terms, and the target are standardized with
+        statistics from the first chunk, which should be a representative 
+        sample of the data.
+
+        Parameters
+        ----------
+        features: list[str]
+            The feature columns used by the model.
+
+        target: str, default 'property_tax_assessed_values'
+            The target column of each chunk.
+
+        degree: int, default 2
+            The degree of the polynomial expansion.
+
+        batch_size: int, default 256
+            The number of rows in each gradient step.
+
+        learning_rate: str, default 'invscaling'
+            'constant' uses eta0 for every step. 'invscaling' uses
+            eta0 / t ** power_t at step t.
+
+        eta0: float, default 0.01
+            The initial learning rate.
+
+        power_t: float, default 0.25
+            The exponent of the 'invscaling' schedule.
+
+        alpha: float, default 0.0
+            An L2 penalty applied to the coefficients of the standardized 
+            terms.
+
+        n_epochs: int, default 10
+            The most passes over the chunks.
+
+        patience: int, default 3
+            The number of epochs without improvement in validation RMSE 
+            before training stops.
+
+        tol: float, default 1e-4
+            The relative improvement in validation RMSE that counts as an 
+            improvement.
+
+        random_seed: int, default 24
+            The random seed used to shuffle the rows of each chunk.
+    '''
+
+    def __init__(
+        self,
+        features: list[str],
+        target: str = 'property_tax_assessed_values',
+        degree: int = 2,
+        batch_size: int = 256,
+        learning_rate: str = 'invscaling',
+        eta0: float = 0.01,
+        power_t: float = 0.25,
+        alpha: float = 0.0,
+        n_epochs: int = 10,
+        patience: int = 3,
+        tol: float = 1e-4,
+        random_seed: int = 24
+    ):
+        if learning_rate not in ('constant', 'invscaling'):
+            raise ValueError(f"learning_rate must be 'constant' or 'invscaling', not {learning_rate!r}")
+
+        self.features = features
+        self.target = target
+        self.terms = polynomial_terms(len(features), degree)
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.eta0 = eta0
+        self.power_t = power_t
+        self.alpha = alpha
+        self.n_epochs = n_epochs
+        self.patience = patience
+        self.tol = tol
+        self.random_seed = random_seed
+        self.rng = np.random.default_rng(random_seed)
+
+        self.weights = None
+        self.bias = 0.0
+        self.steps = 0
+        self.history = []
+
+    def fit(self, chunks, validation = None) -> 'SGDPolynomialRegressor':
+        '''
+            Train the model for up to n_epochs passes over the chunks, 
+            stopping early once the validation RMSE stops improving. The 
+            weights with the best validation RMSE are kept.
+
+            Parameters
+            ----------
+            chunks: Callable | Iterable
+                A function returning a fresh iterator of prepared DataFrame 
+                chunks for each epoch, such as 
+                lambda: pd.read_csv(path, chunksize = 100_000). A plain 
+                iterator is consumed in a single epoch.
+
+            validation: Callable | DataFrame | Iterable, default None
+                Validation chunks in the same form as chunks. A callable is
+                called for each epoch so the chunks are streamed, and a 
+                DataFrame or a list of chunks is scored as is. A one-shot 
+                iterator can only be used with a plain chunks iterator, 
+                which trains for a single epoch.
+
+            Each call starts from new weights. Use partial_fit to keep 
+            training a fitted model.
+
+            Returns
+            -------
+            SGDPolynomialRegressor: The fitted model.
+        '''
+
+        n_epochs = self.n_epochs if callable(chunks) else 1
+
+        if isinstance(validation, pd.DataFrame):
+            validation = [validation]
+        elif n_epochs > 1 and validation is not None and not callable(validation) and iter(validation) is validation:
+            raise ValueError(
+                'validation is an iterator that would be used up after the first epoch, '
+                'pass a function returning a fresh iterator of chunks instead'
+            )
+
+        self.weights = None
+        self.bias = 0.0
+        self.steps = 0
+        self.history = []
+        self.rng = np.random.default_rng(self.random_seed)
+
+        best = (np.inf, None, None)
+        stale = 0
+
+        for _ in range(n_epochs):
+            for chunk in (chunks() if callable(chunks) else chunks):
+                self.partial_fit(chunk)
+
+            if validation is None:
+                continue
+
+            rmse = self.score(validation() if callable(validation) else validation)
+            self.history.append(rmse)
+
+            if rmse < best[0] * (1 - self.tol):
+                best = (rmse, self.weights.copy(), self.bias)
+                stale = 0
+            else:
+                stale += 1
+                if stale >= self.patience:
+                    break
+
+        if best[1] is not None:
+            _, self.weights, self.bias = best
+
+        return self
+
+    def partial_fit(self, chunk: pd.DataFrame) -> 'SGDPolynomialRegressor':
+        '''
+            Take one pass of mini-batch gradient steps over a chunk.
+        '''
+
+        if self.weights is None:
+            self._set_scaling(chunk)
+
+        X, y = self._standardize(chunk)
+        order = self.rng.permutation(len(y))
+
+        for start in range(0, len(y), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            X_batch = X[batch]
+
+            error = X_batch @ self.weights + self.bias - y[batch]
+
+            self.steps += 1
+            eta = self.eta0 if self.learning_rate == 'constant' else self.eta0 / self.steps ** self.power_t
+
+            self.weights -= eta * (X_batch.T @ error / len(batch) + self.alpha * self.weights)
+            self.bias -= eta * error.mean()
+
+        return self
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        '''
+            Return the model's predictions for the features in X.
+        '''
+
+        X_poly = self._expand(X)
+        return (X_poly @ self.weights + self.bias) * self._y_scale + self._y_mean
+
+    def score(self, chunks) -> float:
+        '''
+            Return the RMSE over a prepared DataFrame or an iterable of 
+            prepared DataFrame chunks.
+        '''
+
+        if isinstance(chunks, pd.DataFrame):
+            chunks = [chunks]
+
+        sse = 0.0
+        n = 0
+        for chunk in chunks:
+            residuals = chunk[self.target].to_numpy(dtype = np.float64) - self.predict(chunk)
+            sse += residuals @ residuals
+            n += len(residuals)
+
+        if n == 0:
+            raise ValueError('Cannot score the model on chunks with no rows')
+
+        return float(np.sqrt(sse / n))
+
+    def _set_scaling(self, chunk: pd.DataFrame) -> None:
+        X = chunk[self.features].to_numpy(dtype = np.float64)
+        self._x_mean = X.mean(axis = 0)
+        self._x_scale = np.where(X.std(axis = 0) > 0, X.std(axis = 0), 1.0)
+
+        X_poly = expand_polynomial((X - self._x_mean) / self._x_scale, self.terms)
+        self._poly_mean = X_poly.mean(axis = 0)
+        self._poly_scale = np.where(X_poly.std(axis = 0) > 0, X_poly.std(axis = 0), 1.0)
+
+        y = chunk[self.target].to_numpy(dtype = np.float64)
+        self._y_mean = y.mean()
+        self._y_scale = y.std() if y.std() > 0 else 1.0
+
+        self.weights = np.zeros(len(self.terms))
+
+    def _expand(self, X: pd.DataFrame) -> np.ndarray:
+        X = (X[self.features].to_numpy(dtype = np.float64) - self._x_mean) / self._x_scale
+        return (expand_polynomial(X, self.terms) - self._poly_mean) / self._poly_scale
+
+    def _standardize(self, chunk: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        y = (chunk[self.target].to_numpy(dtype = np.float64) - self._y_mean) / self._y_scale
+        return self._expand(chunk), y
+
+################################################################################
+
+def _path_rmse(X_poly: np.ndarray, y, coefs: np.ndarray, intercepts: np.ndarray) -> np.ndarray:
+    '''
+        Return the RMSE of every model in a coefficient path.
+    '''
+
+    residuals = np.asarray(y, dtype = np.float64)[:, None] - (X_poly @ coefs + intercepts)
+    return np.sqrt(np.mean(residuals ** 2, axis = 0))
+
+################################################################################
+
+def _predict_blocks(blocks: list[np.ndarray], coef: np.ndarray, intercept: float) -> np.ndarray:
+    '''
+        Return the predictions of a linear model whose design matrix is split
+        into column blocks.
+    '''
+
+    predictions = np.full(blocks[0].shape[0], intercept)
+
+    start = 0
+    for block in blocks:
+        predictions += block @ coef[start:start + block.shape[1]]
+        start += block.shape[1]
+
+    return predictions
+
+################################################################################
+
+def _kfold_order(n: int, k: int, random_seed: int) -> tuple[np.ndarray, list[tuple[int, int]]]:
+    '''
+        Return a random permutation of the rows and the start and stop
+        positions of each fold within that permutation, so that every fold is
+        a contiguous slice once the rows are reordered.
+    '''
+
+    order = np.random.RandomState(random_seed).permutation(n)
+    edges = np.linspace(0, n, k + 1).astype(int)
+
+    return order, list(zip(edges[:-1], edges[1:]))
+
+################################################################################
+
+def _fold_scores(fold_X, fold_y, fold_stats, total, i) -> tuple[float, float]:
+    '''
+        Fit the model for fold i from the total statistics less the held out
+        fold and return its train and validate RMSE.
+    '''
+
+    coef, intercept = solve_least_squares(total - fold_stats[i])
+
+    sse = np.array([
+        np.sum((y_f - predict_linear(X_f, coef, intercept)) ** 2)
+        for X_f, y_f in zip(fold_X, fold_y)
+    ])
+
+    n_validate = fold_stats[i].n
+    n_train = total.n - n_validate
+
+    return np.sqrt((sse.sum() - sse[i]) / n_train), np.sqrt(sse[i] / n_validate)
@@ -0,0 +1,158 @@
+################################################################################
+#
+#
+#
+#       parallel.py
+#
+#       Description: This file contains the shared helpers for batched
+#           resampling. Resamples and permutations are drawn as seeded index
+#           matrices, and batches run either in this process, on a thread
+#           pool, or on a process pool whose workers receive the data once.
+#
+#       Variables:
+#
+#           _worker_data
+#
+#       Functions:
+#
+#           n_workers(n_jobs)
+#           worker_pool(n_jobs, threads, **data)
+#           worker_data()
+#           batch_seeds(total, batch_size, random_seed, extra)
+#           resample_counts(seed, n_resamples, n)
+#           permuted_labels(seed, codes, n_permutations)
+#           _init_worker(data)
+#
+#
+################################################################################
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+################################################################################
+
+_worker_data = {}
+
+################################################################################
+
+def n_workers(n_jobs: int = 1) -> int:
+    '''
+        Return the number of workers for n_jobs. A positive n_jobs is used
+        as is, None means 1, and a negative n_jobs counts back from the 
+        number of cores, so -1 uses every core and -2 all but one.
+    '''
+
+    if n_jobs is None:
+        return 1
+
+    if n_jobs == 0:
+        raise ValueError('n_jobs must not be 0')
+
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+
+    return n_jobs
+
+################################################################################
+
+@contextmanager
+def worker_pool(n_jobs: int = 1, threads: bool = False, **data):
+    '''
+        Yield a map function that runs a function over batches, in this 
+        process when n_jobs is 1 and on a pool of n_workers(n_jobs) workers
+        otherwise. The keyword data is sent to each worker once and read 
+        inside the function with worker_data().
+
+        A process pool needs a module level function. A thread pool shares
+        the data without copying it and can run closures, which suits 
+        numpy work that releases the GIL.
+
+        The yielded map takes the function, its iterables, and an optional
+        chunksize, like ProcessPoolExecutor.map.
+    '''
+
+    n_jobs = n_workers(n_jobs)
+
+    if n_jobs != 1 and not threads:
+        with ProcessPoolExecutor(max_workers = n_jobs, initializer = _init_worker, initargs = (data, )) as executor:
+            yield executor.map
+        return
+
+    # An in-process pool may run inside a worker, for example a permutation
+    # test run by the hypothesis runner, so the outer data is put back
+    outer = dict(_worker_data)
+    _init_worker(data)
+
+    try:
+        if n_jobs == 1:
+            yield lambda func, *iterables, chunksize = 1: map(func, *iterables)
+        else:
+            with ThreadPoolExecutor(max_workers = n_jobs) as executor:
+                yield executor.map
+    finally:
+        _init_worker(outer)
+
+################################################################################
+
+def worker_data() -> dict:
+    '''
+        Return the data given to the current worker_pool.
+    '''
+
+    return _worker_data
+
+################################################################################
+
+def batch_seeds(
+    total: int,
+    batch_size: int,
+    random_seed: int | np.random.SeedSequence,
+    extra: int = 0
+) -> tuple[list[int], list[np.random.SeedSequence]]:
+    '''
+        Split total draws into batches of at most batch_size and return the
+        batch sizes with an independent seed for each batch, followed by
+        extra seeds for any other random draws.
+    '''
+
+    sizes = [min(batch_size, total - start) for start in range(0, total, batch_size)]
+    seed_sequence = random_seed if isinstance(random_seed, np.random.SeedSequence) else np.random.SeedSequence(random_seed)
+
+    return sizes, seed_sequence.spawn(len(sizes) + extra)
+
+################################################################################
+
+def resample_counts(seed: np.random.SeedSequence, n_resamples: int, n: int) -> np.ndarray:
+    '''
+        Draw n_resamples bootstrap resamples of n rows as one index matrix
+        and return how many times each row was drawn in each resample, as a
+        matrix of shape (n_resamples, n).
+    '''
+
+    indices = np.random.default_rng(seed).integers(0, n, (n_resamples, n))
+    indices += np.arange(n_resamples)[:, None] * n
+
+    return np.bincount(indices.ravel(), minlength = n_resamples * n).reshape(n_resamples, n)
+
+################################################################################
+
+def permuted_labels(seed: np.random.SeedSequence, codes: np.ndarray, n_permutations: int) -> np.ndarray:
+    '''
+        Shuffle the group codes independently for each permutation and return
+        them as a matrix of shape (n_permutations, len(codes)).
+    '''
+
+    return np.random.default_rng(seed).permuted(np.broadcast_to(codes, (n_permutations, len(codes))), axis = 1)
+
+################################################################################
+
+def _init_worker(data: dict) -> None:
+    '''
+        Replace the worker data, once in each worker process.
+    '''
+
+    _worker_data.clear()
+    _worker_data.update(data)
@@ -8,15 +8,19 @@
 #
 #       Fields:
 #
-#           None
+#           _column_names
+#           _fips_codes
+#           _coordinate_columns
 #
 #       Functions:
 #
 #           prepare_zillow_data(df)
+#           prepare_zillow_records(df, fill_values)
+#           get_fill_values(df)
 #           split_data(df, stratify, random_seed = 24)
 #           remove_outliers(df, k, col_list)
-#           scale_data(train, validate, test)
-#           _fill_missing_values(df)
+#           scale_data(train, validate, test, columns, dtype)
+#           _fill_missing_values(df, fill_values)
 #           _drop_columns(df)
 #           _cast_columns(df)
 #
@@ -30,6 +34,25 @@ from sklearn.model_selection import train_test_split
 
 ################################################################################
 
+# Readable names for the columns kept by prepare_zillow_data
+_column_names = {
+    'bedroomcnt' : 'bedroom_count',
+    'bathroomcnt' : 'bathroom_count',
+    'calculatedfinishedsquarefeet' : 'square_feet',
+    'taxvaluedollarcnt' : 'property_tax_assessed_values',
+    'buildingqualitytypeid' : 'building_quality',
+    'fips_6037' : 'fed_code_6037',
+    'fips_6059' : 'fed_code_6059',
+    'fips_6111' : 'fed_code_6111'
+}
+
+_fips_codes = [6037, 6059, 6111]
+
+# Raw parcel coordinates, used by util.spatial and never scaled
+_coordinate_columns = ['latitude', 'longitude']
+
+################################################################################
+
 def prepare_zillow_data(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
     '''
         Returns a prepared zillow dataset with all missing values handled.
@@ -62,21 +85,81 @@ def prepare_zillow_data(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
     df = _drop_columns(df)
 
     # Rename the columns for readability
-    df = df.rename(columns = {
-        'bedroomcnt' : 'bedroom_count',
-        'bathroomcnt' : 'bathroom_count',
-        'calculatedfinishedsquarefeet' : 'square_feet',
-        'taxvaluedollarcnt' : 'property_tax_assessed_values',
-        'buildingqualitytypeid' : 'building_quality',
-        'fips_6037' : 'fed_code_6037',
-        'fips_6059' : 'fed_code_6059',
-        'fips_6111' : 'fed_code_6111'
-    })
+    df = df.rename(columns = _column_names)
     
     return df
 
 ################################################################################
 
+def prepare_zillow_records(df: pd.DataFrame, fill_values: dict[str, float]) -> pd.DataFrame:
+    '''
+        Returns new zillow records prepared the same way as 
+        prepare_zillow_data, using missing value fills computed from the
+        training data. Records without a target value are kept, and every
+        county gets a dummy column whether or not it appears in the records.
+        
+        Parameters
+        ----------
+        df: DataFrame
+            A pandas dataframe of unprepared zillow records with the columns
+            returned by the zillow sql query.
+
+        fill_values: dict[str, float]
+            The values used to fill missing values, from get_fill_values.
+        
+        Returns
+        -------
+        DataFrame: A pandas dataframe containing the prepared records.
+    '''
+
+    df = df.reindex(columns = df.columns.union(fill_values.keys(), sort = False))
+    
+    df = _fill_missing_values(df, fill_values)
+    df = _cast_columns(df)
+
+    fips = df.fips.astype('int')
+    for code in _fips_codes:
+        df[f'fips_{code}'] = (fips == code).astype('uint8')
+    df = df.drop(columns = 'fips')
+
+    df['property_age'] = 2017 - df.yearbuilt
+    df = df.drop(columns = 'yearbuilt')
+
+    df['amenities'] = df.hashottuborspa + df.poolcnt + df.fireplacecnt
+
+    df = df.drop(columns = ['fireplacecnt', 'hashottuborspa', 'poolcnt'])
+
+    return df.rename(columns = _column_names)
+
+################################################################################
+
+def get_fill_values(df: pd.DataFrame) -> dict[str, float]:
+    '''
+        Returns the values used to fill missing values in the unprepared
+        zillow dataset.
+    
+        Parameters
+        ----------
+        df: DataFrame
+            A pandas dataframe containing the zillow dataset.
+    
+        Returns
+        -------
+        dict[str, float]: The fill value for each column with missing values.
+    '''
+
+    return {
+        'calculatedfinishedsquarefeet' : df.calculatedfinishedsquarefeet.mean(),
+        'yearbuilt' : df.yearbuilt.mode()[0],
+        'fireplacecnt' : 0,
+        'hashottuborspa' : 0,
+        'poolcnt' : 0,
+        'buildingqualitytypeid' : df.buildingqualitytypeid.median(),
+        'lotsizesquarefeet' : df.lotsizesquarefeet.median()
+    }
+
+################################################################################
+
 def split_data(df: pd.core.frame.DataFrame, random_seed: int = 24, stratify: str = None) -> tuple[
     pd.core.frame.DataFrame,
     pd.core.frame.DataFrame,
@@ -173,7 +256,7 @@ def remove_outliers(df: pd.core.frame.DataFrame, k: float, col_list: list[str])
 
 ################################################################################
 
-def scale_data(train: pd.DataFrame, validate: pd.DataFrame, test: pd.DataFrame, columns: list[str]) -> tuple[
+def scale_data(train: pd.DataFrame, validate: pd.DataFrame, test: pd.DataFrame, columns: list[str], dtype = None) -> tuple[
     pd.DataFrame
 ]:
     '''
@@ -189,6 +272,14 @@ def scale_data(train: pd.DataFrame, validate: pd.DataFrame, test: pd.DataFrame,
 
         test: DataFrame
             The out of sample test dataset for a machine learning problem.
+
+        columns: list[str]
+            The columns to scale. latitude and longitude are left unscaled
+            so they remain usable as coordinates.
+
+        dtype: default None
+            If given, such as np.float32, the scaled columns are cast to this
+            type.
     
         Returns
         -------
@@ -196,44 +287,48 @@ def scale_data(train: pd.DataFrame, validate: pd.DataFrame, test: pd.DataFrame,
             columns scaled.
     '''
 
+    columns = [column for column in columns if column not in _coordinate_columns]
+
     scaler = MinMaxScaler()
     
     train[columns] = scaler.fit_transform(train[columns])
     validate[columns] = scaler.transform(validate[columns])
     test[columns] = scaler.transform(test[columns])
+
+    if dtype is not None:
+        train[columns] = train[columns].astype(dtype)
+        validate[columns] = validate[columns].astype(dtype)
+        test[columns] = test[columns].astype(dtype)
     
     return train, validate, test
 
 ################################################################################
 
-def _fill_missing_values(df: pd.core.frame.DataFrame) -> pd.core.frame.DataFrame:
+def _fill_missing_values(df: pd.core.frame.DataFrame, fill_values: dict[str, float] = None) -> pd.core.frame.DataFrame:
     '''
-        Fill in all missing values with 0 and return the dataframe.
+        Fill in all missing values and return the dataframe.
     
         Parameters
         ----------
         df: DataFrame
             A pandas dataframe containing the zillow dataset.
+
+        fill_values: dict[str, float], default None
+            The values used to fill missing values. If None they are computed
+            from df with get_fill_values.
     
         Returns
         -------
         DataFrame: A pandas dataframe containing the zillow dataset with all 
-            missing values filled with 0.
+            missing values filled.
     '''
 
-    avg_square_feet = df.calculatedfinishedsquarefeet.mean()
-    df.calculatedfinishedsquarefeet.fillna(avg_square_feet, inplace = True)
-
-    df.yearbuilt.fillna(df.yearbuilt.mode()[0], inplace = True)
-    df.fireplacecnt.fillna(0, inplace = True)
-    df.hashottuborspa.fillna(0, inplace = True)
-    df.poolcnt.fillna(0, inplace = True)
-
-    median_quality = df.buildingqualitytypeid.median()
-    df.buildingqualitytypeid.fillna(median_quality, inplace = True)
+    if fill_values is None:
+        fill_values = get_fill_values(df)
 
-    median_lotsize = df.lotsizesquarefeet.median()
-    df.lotsizesquarefeet.fillna(median_lotsize, inplace = True)
+    df = df.copy()
+    for column, value in fill_values.items():
+        df[column] = df[column].fillna(value)
 
     return df
 
@@ -0,0 +1,371 @@
+################################################################################
+#
+#
+#
+#       registry.py
+#
+#       Description: This file contains a sqlite backed registry of model
+#           results. Results are keyed on the data fingerprint, the feature
+#           list, the polynomial degree, the model type and its parameters,
+#           and the version of the modeling code, so that an experiment that
+#           has already been scored can be served from the registry instead
+#           of being run again. It also contains a sqlite store of
+#           evaluation reports, which keeps the metrics, timing, row counts,
+#           and data fingerprint of every scored model so runs can be 
+#           filtered and compared later.
+#
+#       Classes:
+#
+#           ResultRegistry
+#           ReportStore
+#
+#       Functions:
+#
+#           code_version()
+#
+#
+################################################################################
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from util.artifact import save_model
+from util.evaluate import RegressionMetrics, regression_metrics
+
+################################################################################
+
+class ResultRegistry:
+    '''
+        A file backed registry of model metrics and artifacts.
+
+        Parameters
+        ----------
+        path: str, default 'results.db'
+            The path of the sqlite database. Model artifacts are saved in an
+            artifacts directory next to it.
+    '''
+
+    def __init__(self, path: str = 'results.db'):
+        self.path = path
+        self.artifact_dir = os.path.join(os.path.dirname(os.path.abspath(path)), 'artifacts')
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT,
+                    features TEXT,
+                    degree INTEGER,
+                    model_type TEXT,
+                    params TEXT,
+                    code_version TEXT,
+                    metrics TEXT,
+                    artifact TEXT,
+                    created REAL
+                )
+            ''')
+
+    def key(
+        self,
+        fingerprint: str,
+        features: list[str],
+        degree: int,
+        model_type: str,
+        params: dict = None
+    ) -> str:
+        '''
+            Return the registry key for an experiment. The current code
+            version is part of the key.
+        '''
+
+        return hashlib.sha256(json.dumps([
+            fingerprint,
+            list(features),
+            degree,
+            model_type,
+            params or {},
+            code_version()
+        ], sort_keys = True).encode()).hexdigest()
+
+    def get(self, key: str) -> dict:
+        '''
+            Return the stored result for a key, or None if the experiment has
+            not been scored. The result holds the metrics and the path of the
+            model artifact, if one was saved.
+        '''
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            row = connection.execute(
+                'SELECT metrics, artifact FROM results WHERE key = ?',
+                (key, )
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {'metrics' : json.loads(row[0]), 'artifact' : row[1]}
+
+    def put(
+        self,
+        key: str,
+        metrics: dict,
+        fingerprint: str,
+        features: list[str],
+        degree: int,
+        model_type: str,
+        params: dict = None,
+        artifact: str = None
+    ) -> None:
+        '''
+            Store the result of an experiment, replacing any result already
+            stored under its key.
+        '''
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    key,
+                    fingerprint,
+                    json.dumps(list(features)),
+                    degree,
+                    model_type,
+                    json.dumps(params or {}, sort_keys = True),
+                    code_version(),
+                    json.dumps(metrics),
+                    artifact,
+                    time.time()
+                )
+            )
+
+    def artifact_path(self, key: str) -> str:
+        '''
+            Return the path where the model artifact for a key is saved.
+        '''
+
+        os.makedirs(self.artifact_dir, exist_ok = True)
+        return os.path.join(self.artifact_dir, f'{key}.npz')
+
+    def save_artifact(
+        self,
+        key: str,
+        model,
+        imputer: dict[str, float] = None,
+        scaler = None,
+        fingerprint: str = ''
+    ) -> str:
+        '''
+            Save a fitted model with the preprocessing state needed to score
+            raw records, and return the path of the artifact. imputer and 
+            scaler are passed to util.artifact.save_model.
+        '''
+
+        path = self.artifact_path(key)
+        save_model(path, model, imputer, scaler, fingerprint)
+
+        return path
+
+################################################################################
+
+class ReportStore:
+    '''
+        A file backed store of evaluation reports. Each report is one model
+        scored on one split of the data in one run, with its metrics in 
+        their own columns so reports can be filtered and compared in sql.
+
+        Parameters
+        ----------
+        path: str, default 'reports.db'
+            The path of the sqlite database.
+    '''
+
+    metrics = list(RegressionMetrics._fields)
+
+    def __init__(self, path: str = 'reports.db'):
+        self.path = path
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS reports (
+                    run TEXT,
+                    model TEXT,
+                    split TEXT,
+                    rows INTEGER,
+                    fingerprint TEXT,
+                    SSE REAL,
+                    ESS REAL,
+                    TSS REAL,
+                    MSE REAL,
+                    RMSE REAL,
+                    seconds REAL,
+                    params TEXT,
+                    code_version TEXT,
+                    created REAL
+                )
+            ''')
+            connection.execute('CREATE INDEX IF NOT EXISTS reports_run ON reports (run)')
+            connection.execute('CREATE INDEX IF NOT EXISTS reports_model ON reports (model, split)')
+
+    def new_run(self) -> str:
+        '''
+            Return a new run id, which sorts by the time it was created.
+        '''
+
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def record(
+        self,
+        run: str,
+        model: str,
+        split: str,
+        metrics: RegressionMetrics,
+        rows: int,
+        seconds: float = None,
+        fingerprint: str = '',
+        params: dict = None
+    ) -> None:
+        '''
+            Store the metrics of a model on one split of the data.
+        '''
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                'INSERT INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    run,
+                    model,
+                    split,
+                    int(rows),
+                    fingerprint,
+                    *(float(value) for value in metrics),
+                    seconds,
+                    json.dumps(params or {}, sort_keys = True),
+                    code_version(),
+                    time.time()
+                )
+            )
+
+    def score(
+        self,
+        run: str,
+        model: str,
+        split: str,
+        actual,
+        predictions,
+        seconds: float = None,
+        fingerprint: str = '',
+        params: dict = None
+    ) -> RegressionMetrics:
+        '''
+            Score a model's predictions, store the metrics, and return them.
+        '''
+
+        metrics = regression_metrics(actual, predictions)
+        self.record(run, model, split, metrics, len(actual), seconds, fingerprint, params)
+
+        return metrics
+
+    def query(
+        self,
+        run: str = None,
+        model: str = None,
+        split: str = None,
+        fingerprint: str = None,
+        since: float = None
+    ) -> pd.DataFrame:
+        '''
+            Return the stored reports matching every given filter, oldest 
+            first. since is a unix timestamp.
+        '''
+
+        filters = {'run = ?' : run, 'model = ?' : model, 'split = ?' : split, 'fingerprint = ?' : fingerprint, 'created >= ?' : since}
+        filters = {clause : value for clause, value in filters.items() if value is not None}
+
+        sql = 'SELECT * FROM reports'
+        if filters:
+            sql += ' WHERE ' + ' AND '.join(filters)
+
+        with closing(sqlite3.connect(self.path)) as connection:
+            return pd.read_sql_query(sql + ' ORDER BY created', connection, params = list(filters.values()))
+
+    def runs(self) -> pd.DataFrame:
+        '''
+            Return each run with its start time, fingerprints, and number of
+            reports, oldest first.
+        '''
+
+        with closing(sqlite3.connect(self.path)) as connection:
+            return pd.read_sql_query('''
+                SELECT run, MIN(created) AS created, GROUP_CONCAT(DISTINCT fingerprint) AS fingerprints, COUNT(*) AS reports
+                FROM reports
+                GROUP BY run
+                ORDER BY created
+            ''', connection)
+
+    def diff(self, run: str, other: str, metric: str = 'RMSE') -> pd.DataFrame:
+        '''
+            Compare a metric between two runs for each model and split. A 
+            model and split reported more than once in a run uses its latest
+            report.
+
+            Parameters
+            ----------
+            run: str
+                The run id to compare against.
+
+            other: str
+                The run id compared with run.
+
+            metric: str, default 'RMSE'
+                The metric to compare.
+
+            Returns
+            -------
+            DataFrame: The metric in each run, the change from run to other,
+                and the relative change, indexed by model and split. Models
+                in only one of the runs have missing values for the other.
+                Comparing a run with itself gives a change of zero, with 
+                the run columns suffixed _run and _other.
+        '''
+
+        if metric not in self.metrics + ['rows', 'seconds']:
+            raise ValueError(f'Unknown metric {metric!r}')
+
+        # A run compared with itself still gets a column for each side
+        columns = (run, other) if run != other else (f'{run}_run', f'{other}_other')
+
+        reports = self.query(run).groupby(['model', 'split'])[metric].last()
+        other_reports = reports if other == run else self.query(other).groupby(['model', 'split'])[metric].last()
+
+        diff = pd.concat([reports.rename(columns[0]), other_reports.rename(columns[1])], axis = 1)
+        diff['change'] = diff[columns[1]] - diff[columns[0]]
+        diff['relative_change'] = diff['change'] / diff[columns[0]].replace(0, np.nan)
+
+        return diff
+
+################################################################################
+
+@lru_cache(maxsize = None)
+def code_version() -> str:
+    '''
+        Return a hash of the modeling code, so results produced by older code
+        are not served after the code changes.
+    '''
+
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    for name in ('linear.py', 'model.py', 'evaluate.py'):
+        with open(os.path.join(directory, name), 'rb') as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()[:16]
@@ -0,0 +1,430 @@
+################################################################################
+#
+#
+#
+#       serve.py
+#
+#       Description: This file contains a local asyncio http server that scores
+#           zillow parcels with a saved model artifact, and a load generator
+#           for measuring its latency and throughput. Concurrent requests are
+#           combined into micro-batches so the model scores many records with
+#           one vectorized call.
+#
+#           Usage:
+#
+#               python -m util.serve model.npz --port 8000
+#               python -m util.serve model.npz --load-test zillow.csv
+#
+#       Classes:
+#
+#           MicroBatcher
+#
+#       Functions:
+#
+#           start_server(artifact, host, port, max_batch_size, max_latency)
+#           load_test(host, port, records, n_requests, concurrency, batch_size)
+#           main()
+#           _handle_connection(reader, writer, batcher)
+#           _route(method, target, body, batcher)
+#           _read_message(reader)
+#           _write_message(writer, start_line, payload)
+#
+#
+################################################################################
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from util.artifact import ModelArtifact, load_model
+from util.prepare import prepare_zillow_records
+
+################################################################################
+
+class MicroBatcher:
+    '''
+        Collects the records from concurrent requests into batches and scores
+        each batch with a single call to the model. A batch is scored once it
+        holds max_batch_size records or once max_latency seconds have passed
+        since its first request arrived, whichever comes first.
+
+        Parameters
+        ----------
+        artifact: ModelArtifact
+            The model used to score records.
+
+        max_batch_size: int, default 1024
+            The number of records that triggers scoring a batch immediately.
+
+        max_latency: float, default 0.005
+            The longest a request waits for other requests to join its batch,
+            in seconds.
+    '''
+
+    def __init__(self, artifact: ModelArtifact, max_batch_size: int = 1024, max_latency: float = 0.005):
+        self.artifact = artifact
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._queue = asyncio.Queue()
+
+    async def predict(self, records: list[dict]) -> list[float]:
+        '''
+            Queue records for scoring and return their predictions once their
+            batch has been scored.
+        '''
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((records, future))
+
+        return await future
+
+    async def run(self) -> None:
+        '''
+            Collect and score batches until cancelled.
+        '''
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+
+            # A failure in one batch is passed to its requests so the
+            # batcher keeps serving the requests that follow
+            try:
+                size = len(batch[0][0])
+                deadline = loop.time() + self.max_latency
+
+                while size < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                    batch.append(item)
+                    size += len(item[0])
+
+                await self._score(batch)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _score(self, batch: list[tuple[list[dict], asyncio.Future]]) -> None:
+        '''
+            Score a batch in a worker thread and hand each request its slice
+            of the predictions. If the batch fails, each request is scored on
+            its own so that one bad record only fails its own request.
+        '''
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            predictions = await loop.run_in_executor(
+                None,
+                self._predict,
+                [record for records, _ in batch for record in records]
+            )
+        except Exception:
+            for records, future in batch:
+                try:
+                    result = (await loop.run_in_executor(None, self._predict, records)).tolist()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            return
+
+        # A request whose client has gone away may already be cancelled
+        start = 0
+        for records, future in batch:
+            if not future.done():
+                future.set_result(predictions[start:start + len(records)].tolist())
+            start += len(records)
+
+    def _predict(self, records: list[dict]) -> np.ndarray:
+        df = prepare_zillow_records(pd.DataFrame.from_records(records), self.artifact.imputer)
+        return self.artifact.predict_batch(df)
+
+################################################################################
+
+async def start_server(
+    artifact: ModelArtifact,
+    host: str = '127.0.0.1',
+    port: int = 8000,
+    max_batch_size: int = 1024,
+    max_latency: float = 0.005
+) -> tuple[asyncio.AbstractServer, asyncio.Task]:
+    '''
+        Start the scoring server.
+
+        The server accepts POST /predict with a json body holding a single
+        record or a list of records, each shaped like a row of the zillow sql
+        query, and responds with {"predictions": [...]}. GET /health responds
+        with the fingerprint of the model's training data.
+
+        Parameters
+        ----------
+        artifact: ModelArtifact
+            The model used to score records.
+
+        host: str, default '127.0.0.1'
+            The address to listen on.
+
+        port: int, default 8000
+            The port to listen on.
+
+        max_batch_size: int, default 1024
+            The number of records that triggers scoring a batch immediately.
+
+        max_latency: float, default 0.005
+            The longest a request waits for other requests to join its batch,
+            in seconds.
+
+        Returns
+        -------
+        tuple: The asyncio server and the task running the micro-batcher.
+    '''
+
+    batcher = MicroBatcher(artifact, max_batch_size, max_latency)
+    batcher_task = asyncio.create_task(batcher.run())
+
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_connection(reader, writer, batcher),
+        host,
+        port
+    )
+
+    return server, batcher_task
+
+################################################################################
+
+async def load_test(
+    host: str,
+    port: int,
+    records: list[dict],
+    n_requests: int = 1000,
+    concurrency: int = 32,
+    batch_size: int = 1
+) -> dict:
+    '''
+        Send requests to a running scoring server and report the latency and
+        throughput. Each concurrent client keeps one connection open and
+        sends its requests one after another.
+
+        Parameters
+        ----------
+        host: str
+            The address of the server.
+
+        port: int
+            The port of the server.
+
+        records: list[dict]
+            Sample records to send, cycled through in order.
+
+        n_requests: int, default 1000
+            The total number of requests to send.
+
+        concurrency: int, default 32
+            The number of concurrent clients.
+
+        batch_size: int, default 1
+            The number of records in each request. A batch size of 1 sends
+            single records rather than lists.
+
+        Returns
+        -------
+        dict: The request count, p50 and p99 latency in milliseconds, and the
+            requests and records scored per second.
+    '''
+
+    bodies = [
+        records[i % len(records)] if batch_size == 1 else
+        [records[(i + j) % len(records)] for j in range(batch_size)]
+        for i in range(0, n_requests * batch_size, batch_size)
+    ]
+    latencies = []
+
+    async def client(start: int) -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+
+        for body in bodies[start::concurrency]:
+            began = time.perf_counter()
+            _write_message(writer, 'POST /predict HTTP/1.1', body)
+            await writer.drain()
+
+            status, _, _ = await _read_message(reader)
+            if not status.startswith('HTTP/1.1 200'):
+                raise RuntimeError(f'Request failed: {status}')
+
+            latencies.append(time.perf_counter() - began)
+
+        writer.close()
+        await writer.wait_closed()
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(min(concurrency, n_requests))))
+    elapsed = time.perf_counter() - began
+
+    return {
+        'requests' : n_requests,
+        'p50_ms' : float(np.percentile(latencies, 50) * 1000),
+        'p99_ms' : float(np.percentile(latencies, 99) * 1000),
+        'requests_per_second' : n_requests / elapsed,
+        'records_per_second' : n_requests * batch_size / elapsed
+    }
+
+################################################################################
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = 'Score zillow parcels with a saved model artifact.')
+    parser.add_argument('artifact', help = 'path to a model artifact saved with util.artifact.save_model')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8000)
+    parser.add_argument('--max-batch-size', type = int, default = 1024)
+    parser.add_argument('--max-latency-ms', type = float, default = 5.0)
+    parser.add_argument('--load-test', metavar = 'CSV', help = 'run the load generator with records from a csv file, then exit')
+    parser.add_argument('--requests', type = int, default = 1000)
+    parser.add_argument('--concurrency', type = int, default = 32)
+    parser.add_argument('--batch-size', type = int, default = 1)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        server, batcher_task = await start_server(
+            load_model(args.artifact),
+            args.host,
+            args.port,
+            args.max_batch_size,
+            args.max_latency_ms / 1000
+        )
+
+        async with server:
+            if args.load_test:
+                records = pd.read_csv(args.load_test).replace({np.nan : None}).to_dict('records')
+                report = await load_test(
+                    args.host,
+                    args.port,
+                    records,
+                    args.requests,
+                    args.concurrency,
+                    args.batch_size
+                )
+                print(json.dumps(report, indent = 4))
+                batcher_task.cancel()
+            else:
+                await server.serve_forever()
+
+    asyncio.run(run())
+
+################################################################################
+
+async def _handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, batcher: MicroBatcher) -> None:
+    '''
+        Serve http requests on one connection until the client closes it.
+    '''
+
+    try:
+        while True:
+            try:
+                start_line, headers, body = await _read_message(reader)
+            except (asyncio.IncompleteReadError, ValueError):
+                break
+
+            try:
+                method, target, _ = start_line.split(' ', 2)
+            except ValueError:
+                _write_message(writer, 'HTTP/1.1 400 Bad Request', {'error' : f'Malformed request line {start_line!r}'})
+                await writer.drain()
+                break
+
+            status, payload = await _route(method, target, body, batcher)
+            _write_message(writer, f'HTTP/1.1 {status}', payload)
+            await writer.drain()
+
+            if headers.get('connection', '').lower() == 'close':
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+################################################################################
+
+async def _route(method: str, target: str, body: bytes, batcher: MicroBatcher) -> tuple[str, dict]:
+    '''
+        Return the status and json payload for a request.
+    '''
+
+    if method == 'GET' and target == '/health':
+        return '200 OK', {'status' : 'ok', 'fingerprint' : batcher.artifact.fingerprint}
+
+    if method != 'POST' or target != '/predict':
+        return '404 Not Found', {'error' : f'No route for {method} {target}'}
+
+    try:
+        records = json.loads(body)
+    except ValueError as e:
+        return '400 Bad Request', {'error' : f'Invalid json: {e}'}
+
+    single = isinstance(records, dict)
+    if not single and not (isinstance(records, list) and all(isinstance(record, dict) for record in records)):
+        return '400 Bad Request', {'error' : 'The body must be a record or a list of records'}
+
+    try:
+        predictions = await batcher.predict([records] if single else records)
+    except Exception as e:
+        return '400 Bad Request', {'error' : f'Could not score records: {e!r}'}
+
+    return '200 OK', {'predictions' : predictions[0] if single else predictions}
+
+################################################################################
+
+async def _read_message(reader: asyncio.StreamReader) -> tuple[str, dict[str, str], bytes]:
+    '''
+        Read an http message and return its start line, headers, and body.
+    '''
+
+    start_line = (await reader.readline()).decode('latin-1').strip()
+    if not start_line:
+        raise asyncio.IncompleteReadError(b'', None)
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+    return start_line, headers, body
+
+################################################################################
+
+def _write_message(writer: asyncio.StreamWriter, start_line: str, payload) -> None:
+    '''
+        Write an http message with a json body.
+    '''
+
+    body = json.dumps(payload).encode()
+    writer.write(
+        f'{start_line}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+        + body
+    )
+
+################################################################################
+
+if __name__ == '__main__':
+    main()
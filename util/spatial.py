@@ -0,0 +1,210 @@
+################################################################################
+#
+#
+#
+#       spatial.py
+#
+#       Description: This file contains a comparable sales estimator that
+#           values a parcel from the values of its nearest neighbors in the
+#           training data, using a KD-tree over the parcel coordinates. The
+#           latitude and longitude columns come from the zillow sql query; a
+#           zillow.csv cached before they were added must be refreshed with
+#           get_zillow_data(use_cache = False).
+#
+#       Classes:
+#
+#           ComparableSalesEstimator
+#
+#       Functions:
+#
+#           add_comparable_value(train, validate, test, k)
+#           _coordinates(df)
+#
+#
+################################################################################
+
+import numpy as np
+import pandas as pd
+
+from scipy.spatial import cKDTree
+
+from util.parallel import n_workers
+
+################################################################################
+
+class ComparableSalesEstimator:
+    '''
+        Estimates a parcel's value as the average value of its k nearest
+        training parcels.
+
+        Coordinates are projected onto a plane by scaling longitude by the
+        cosine of the mean training latitude, which is accurate over an area
+        the size of southern California. Queries are answered in batches and
+        can be spread across threads.
+
+        Parameters
+        ----------
+        k: int, default 10
+            The number of comparable parcels.
+
+        weights: str, default 'distance'
+            'uniform' averages the comparables equally, 'distance' weights
+            them by inverse distance.
+
+        n_jobs: int, default -1
+            The number of threads used for queries, -1 for all cores.
+    '''
+
+    def __init__(self, k: int = 10, weights: str = 'distance', n_jobs: int = -1):
+        if weights not in ('uniform', 'distance'):
+            raise ValueError(f"weights must be 'uniform' or 'distance', not {weights!r}")
+
+        self.k = k
+        self.weights = weights
+        self.n_jobs = n_jobs
+
+    def fit(self, X: pd.DataFrame, y) -> 'ComparableSalesEstimator':
+        '''
+            Index the training parcels. Parcels without coordinates are left
+            out of the index.
+
+            Parameters
+            ----------
+            X: DataFrame
+                The training parcels, with latitude and longitude columns.
+
+            y: Series
+                The training target.
+        '''
+
+        latitude, longitude = _coordinates(X)
+        located = ~(np.isnan(latitude) | np.isnan(longitude))
+
+        self._cos_latitude = np.cos(np.radians(latitude[located].mean()))
+        self._y = np.asarray(y, dtype = np.float64)[located]
+        self._mean = self._y.mean()
+        self._tree = cKDTree(self._project(latitude[located], longitude[located]))
+
+        return self
+
+    def predict(self, X: pd.DataFrame, exclude_self: bool = False) -> np.ndarray:
+        '''
+            Return the estimated value of each parcel. Parcels without
+            coordinates are given the mean training value.
+
+            Parameters
+            ----------
+            X: DataFrame
+                The parcels to value, with latitude and longitude columns.
+
+            exclude_self: bool, default False
+                If True, each parcel is left out of its own comparables. Use
+                this only when X is the training data passed to fit, in the
+                same order, so a parcel is not its own comparable.
+
+            Returns
+            -------
+            ndarray: The estimated values.
+        '''
+
+        latitude, longitude = _coordinates(X)
+        located = ~(np.isnan(latitude) | np.isnan(longitude))
+
+        k = self.k + 1 if exclude_self else self.k
+        distances, indices = self._tree.query(
+            self._project(latitude[located], longitude[located]),
+            k = k,
+            workers = n_workers(self.n_jobs)
+        )
+        distances = distances.reshape(-1, k)
+        indices = indices.reshape(-1, k)
+
+        if exclude_self:
+            # Parcels at the same coordinates can come back in any order, so
+            # drop each parcel's own index rather than its nearest neighbor.
+            # If a parcel is not among its k + 1 neighbors, drop the farthest.
+            own = indices == np.arange(len(indices))[:, None]
+            own[~own.any(axis = 1), -1] = True
+
+            keep = ~own
+            distances = distances[keep].reshape(-1, self.k)
+            indices = indices[keep].reshape(-1, self.k)
+
+        values = self._y[indices]
+        if self.weights == 'uniform':
+            estimates = values.mean(axis = 1)
+        else:
+            # Parcels at the same coordinates share the largest weight
+            weights = 1 / np.maximum(distances, 1e-9)
+            estimates = (values * weights).sum(axis = 1) / weights.sum(axis = 1)
+
+        predictions = np.full(len(latitude), self._mean)
+        predictions[located] = estimates
+
+        return predictions
+
+    def _project(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        return np.column_stack([latitude, longitude * self._cos_latitude])
+
+################################################################################
+
+def add_comparable_value(
+    train: pd.DataFrame,
+    validate: pd.DataFrame,
+    test: pd.DataFrame,
+    k: int = 10
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    '''
+        Add a comparable_value column to train, validate, and test with the
+        comparable sales estimate of each parcel from the training parcels.
+        Training parcels are valued without themselves, so the feature does
+        not leak their own target.
+
+        Parameters
+        ----------
+        train: DataFrame
+            The prepared zillow training dataset.
+
+        validate: DataFrame
+            The prepared zillow validate dataset.
+
+        test: DataFrame
+            The prepared zillow test dataset.
+
+        k: int, default 10
+            The number of comparable parcels.
+
+        Returns
+        -------
+        tuple: The three dataframes with a comparable_value column.
+    '''
+
+    estimator = ComparableSalesEstimator(k).fit(train, train.property_tax_assessed_values)
+
+    train = train.assign(comparable_value = estimator.predict(train, exclude_self = True))
+    validate = validate.assign(comparable_value = estimator.predict(validate))
+    test = test.assign(comparable_value = estimator.predict(test))
+
+    return train, validate, test
+
+################################################################################
+
+def _coordinates(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        Return latitude and longitude in degrees. The zillow data stores them
+        as integer millionths of a degree. Scaled coordinates are rejected.
+    '''
+
+    latitude = df.latitude.to_numpy(dtype = np.float64)
+    longitude = df.longitude.to_numpy(dtype = np.float64)
+
+    if np.nanmax(np.abs(latitude)) > 90:
+        latitude = latitude / 1e6
+        longitude = longitude / 1e6
+
+    # Southern california is far from the equator, so latitudes in [0, 1]
+    # mean the coordinates went through a MinMaxScaler
+    if np.nanmax(np.abs(latitude)) <= 1:
+        raise ValueError('latitude and longitude appear to be scaled, pass the unscaled coordinates')
+
+    return latitude, longitude
@@ -1,6 +1,11 @@
+from itertools import combinations
+
 from scipy import stats
+import numpy as np
 import pandas as pd
 
+from util.parallel import n_workers, worker_pool, worker_data, batch_seeds, permuted_labels
+
 ## PROBABILITY DISTRIBUTION FUNCTIONS
 
 probability_distribution = stats._distn_infrastructure.rv_frozen
@@ -137,6 +142,100 @@ def chi2_test(data_for_category1, data_for_category2, alpha=.05):
     # evaluate the hypothesis against the established alpha value
     evaluate_hypothesis(p, alpha)
 
+def chi2_tests(
+    df: pd.DataFrame,
+    columns: list = None,
+    pairs: list = None,
+    alpha: float = 0.05,
+    correction: bool = True
+) -> pd.DataFrame:
+    '''
+    Conducts chi-squared tests for independence for many pairs of categorical columns and returns the
+    results as a table with one row per test.
+
+    Each column is factorized to integer codes once, and the contingency table of a pair is a bincount of
+    the combined codes, so no crosstab is built. Rows missing either value of a pair are left out of
+    that pair's table. The statistic and p value match scipy.stats.chi2_contingency, including the Yates
+    correction for tables with one degree of freedom.
+
+    Parameters
+    ----------
+    df : Pandas DataFrame
+        The dataset containing the categorical columns.
+
+    columns : list, default None
+        The columns to test every pair of. Ignored if pairs is given.
+
+    pairs : list, default None
+        The pairs of columns to test, as tuples.
+
+    alpha : float, default 0.05
+        The alpha value used to determine whether or not to reject the null hypothesis.
+
+    correction : bool, default True
+        Whether to apply the Yates correction for tables with one degree of freedom.
+
+    Returns
+    -------
+    DataFrame : The x and y column, chi^2, p, degrees of freedom, number of observations, Cramer's V, and
+        whether the null hypothesis of independence is rejected for each test.
+
+    Examples
+    --------
+    >>> import stats_util as su
+
+    >>> su.chi2_tests(train, columns = ['fips', 'building_quality', 'bedroom_count', 'amenities'])
+    >>> su.chi2_tests(train, pairs = [('fips', 'bedroom_count'), ('fips', 'amenities')])
+    '''
+
+    if pairs is None:
+        pairs = list(combinations(columns, 2))
+
+    # factorize each column once, missing values get the code -1
+    codes = {}
+    for column in {column for pair in pairs for column in pair}:
+        column_codes, uniques = pd.factorize(df[column])
+        codes[column] = (column_codes, len(uniques))
+
+    results = []
+    for x, y in pairs:
+        (x_codes, x_levels), (y_codes, y_levels) = codes[x], codes[y]
+
+        present = (x_codes >= 0) & (y_codes >= 0)
+        combined = x_codes[present] * y_levels + y_codes[present]
+        observed = np.bincount(combined, minlength = x_levels * y_levels).reshape(x_levels, y_levels)
+
+        # levels that only appear alongside missing values are not part of the table
+        observed = observed[observed.sum(axis = 1) > 0][:, observed.sum(axis = 0) > 0]
+        results.append((x, y, *_chi2_statistic(observed, correction)))
+
+    results = pd.DataFrame(results, columns = ['x', 'y', 'chi2', 'p', 'degf', 'n', 'cramers_v'])
+    results['reject'] = results.p < alpha
+
+    return results
+
+def _chi2_statistic(observed: np.ndarray, correction: bool = True) -> tuple:
+    '''
+    Return the chi^2 statistic, p value, degrees of freedom, number of observations, and Cramer's V of a
+    contingency table.
+    '''
+
+    n = observed.sum()
+    expected = np.outer(observed.sum(axis = 1), observed.sum(axis = 0)) / n
+    degf = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+
+    if degf == 0:
+        return 0.0, 1.0, 0, int(n), 0.0
+
+    difference = np.abs(observed - expected)
+    if correction and degf == 1:
+        difference = np.maximum(difference - 0.5, 0)
+
+    chi2 = float((difference ** 2 / expected).sum())
+    cramers_v = np.sqrt(chi2 / n / (min(observed.shape) - 1))
+
+    return chi2, float(stats.chi2.sf(chi2, degf)), degf, int(n), float(cramers_v)
+
 # PEARSONR CORRELATION TEST FUNCTION
 
 def correlation_test(data_for_category1, data_for_category2, alpha = 0.05):
@@ -158,6 +257,93 @@ def correlation_test(data_for_category1, data_for_category2, alpha = 0.05):
     # evaluate the hypothesis against the established alpha value
     evaluate_hypothesis(p, alpha)
 
+## CORRELATION MATRIX FUNCTION
+
+def correlation_matrix(
+    df: pd.DataFrame,
+    target: str = None,
+    columns: list = None,
+    method: str = 'pearson',
+    alpha: float = 0.05
+) -> pd.DataFrame:
+    '''
+    Conducts correlation tests for every column against the target, or for every pair of columns if no
+    target is given, and returns the results as a table with one row per test.
+
+    All of the correlations are computed together as one matrix product of the standardized columns, and
+    the p values come from the t distribution with n - 2 degrees of freedom, as in scipy.stats.pearsonr.
+    Spearman correlations are Pearson correlations of the ranks. Rows with a missing value in any of the
+    columns are dropped.
+
+    Parameters
+    ----------
+    df : Pandas DataFrame
+        The dataset containing the columns to test.
+
+    target : str, default None
+        The column every other column is tested against. If None every pair of columns is tested.
+
+    columns : list, default None
+        The columns to test. If None all numeric columns other than the target are used.
+
+    method : str, default 'pearson'
+        The correlation to compute, 'pearson' or 'spearman'.
+
+    alpha : float, default 0.05
+        The alpha value used to determine whether or not to reject the null hypothesis.
+
+    Returns
+    -------
+    DataFrame : The x and y column, r, p, number of observations, and whether the null hypothesis of no
+        correlation is rejected for each test.
+
+    Examples
+    --------
+    >>> import stats_util as su
+
+    >>> su.correlation_matrix(train, target = 'property_tax_assessed_values')
+    >>> su.correlation_matrix(train, columns = ['square_feet', 'bedroom_count', 'bathroom_count'], method = 'spearman')
+    '''
+
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"method must be 'pearson' or 'spearman', not {method!r}")
+
+    if columns is None:
+        columns = [column for column in df.select_dtypes('number').columns if column != target]
+
+    names = list(columns) + ([target] if target is not None else [])
+    values = df[names].dropna().to_numpy(dtype = np.float64)
+    n = len(values)
+
+    if method == 'spearman':
+        values = stats.rankdata(values, axis = 0)
+
+    # scale each column to zero mean and unit length so their dot products are correlations
+    values = values - values.mean(axis = 0)
+    values /= np.linalg.norm(values, axis = 0)
+
+    if target is not None:
+        r = values[:, :-1].T @ values[:, -1]
+        x, y = list(columns), [target] * len(columns)
+    else:
+        i, j = np.triu_indices(len(columns), k = 1)
+        r = (values.T @ values)[i, j]
+        x, y = [columns[k] for k in i], [columns[k] for k in j]
+
+    r = np.clip(r, -1, 1)
+    with np.errstate(divide = 'ignore'):
+        t = r * np.sqrt((n - 2) / (1 - r ** 2))
+    p = 2 * stats.t.sf(np.abs(t), n - 2)
+
+    return pd.DataFrame({
+        'x' : x,
+        'y' : y,
+        'r' : r,
+        'p' : p,
+        'n' : n,
+        'reject' : p < alpha
+    })
+
 def equal_var_test(*args, alpha: float = 0.05) -> bool:
     '''
     Given two or more subgroups from a dataset, conducts a test of equal variance and returns whether or
@@ -181,7 +367,10 @@ def two_sample_ttest(
     sample2: pd.core.series.Series,
     alpha: float = 0.05,
     n_clt: int = 30,
-    alternative: str = 'two-sided'
+    alternative: str = 'two-sided',
+    permutation: bool = False,
+    n_permutations: int = 10_000,
+    n_jobs: int = 1
 ) -> None:
     '''
     Given two independent samples from a dataset, conducts a two sample t-test to compare means and outputs
@@ -210,6 +399,16 @@ def two_sample_ttest(
         The type of two sample t-test to perform. Possible values are 'two-sided', 'less', or 'greater',
         where 'less' and 'greater' are one tail t-tests and 'two-sided' is a two tail t-test.
 
+    permutation : bool, default False
+        If True a permutation test of the difference in means is used instead of the parametric or
+        non-parametric test, which makes no assumption about the distribution of the data.
+
+    n_permutations : int, default 10_000
+        The largest number of permutations used by the permutation test.
+
+    n_jobs : int, default 1
+        The number of processes used by the permutation test, -1 for all cores.
+
     Returns
     -------
     None : Nothing is returned by this function. All relevant information is printed to the console.
@@ -221,8 +420,16 @@ def two_sample_ttest(
     >>> su.two_sample_ttest(sample1, sample2)
     >>> su.two_sample_ttest(sample1, sample2, alpha = 0.01, n_clt = 50)
     >>> su.two_sample_ttest(sample1, sample2, alternative = 'less')
+    >>> su.two_sample_ttest(sample1, sample2, permutation = True, n_jobs = 4)
     '''
 
+    if permutation:
+        print(f'Using permutation test...')
+        f, p, n = permutation_test(sample1, sample2, alternative = alternative, n_permutations = n_permutations, alpha = alpha, n_jobs = n_jobs)
+        print(f'Permutations used: {n}')
+        evaluate_hypothesis(p, alpha)
+        return
+
     # Are the samples large enough to assume normal distribution?
     normal_dist = central_limit_theorem_test(sample1, sample2, n_clt = n_clt)
     print(f'Samples contain more than {n_clt} observations: {normal_dist}')
@@ -242,7 +449,14 @@ def two_sample_ttest(
 
     evaluate_hypothesis(p, alpha)
 
-def anova_test(*args, alpha: float = 0.05, n_clt: int = 30) -> None:
+def anova_test(
+    *args,
+    alpha: float = 0.05,
+    n_clt: int = 30,
+    permutation: bool = False,
+    n_permutations: int = 10_000,
+    n_jobs: int = 1
+) -> None:
     '''
     Given three or more subgroups from a dataset, conducts an ANOVA test to compare means and outputs
     the relevant information to the console.
@@ -262,6 +476,16 @@ def anova_test(*args, alpha: float = 0.05, n_clt: int = 30) -> None:
         if the central limit theorem can be used to assume a normal distribution of data. If the sample
         sizes are less than n_clt a non-parametric test will be used.
 
+    permutation : bool, default False
+        If True a permutation test of the F statistic is used instead of the parametric or
+        non-parametric test, which makes no assumption about the distribution of the data.
+
+    n_permutations : int, default 10_000
+        The largest number of permutations used by the permutation test.
+
+    n_jobs : int, default 1
+        The number of processes used by the permutation test, -1 for all cores.
+
     Returns
     -------
     None : Nothing is returned by this function. All relevant information is printed to the console.
@@ -272,8 +496,16 @@ def anova_test(*args, alpha: float = 0.05, n_clt: int = 30) -> None:
 
     >>> su.anova_test(sample1, sample2, sample3)
     >>> su.anova_test(sample1, sample2, sample3, alpha = 0.01, n_clt = 50)
+    >>> su.anova_test(sample1, sample2, sample3, permutation = True, n_jobs = 4)
     '''
 
+    if permutation:
+        print(f'Using permutation test...')
+        f, p, n = permutation_test(*args, n_permutations = n_permutations, alpha = alpha, n_jobs = n_jobs)
+        print(f'Permutations used: {n}')
+        evaluate_hypothesis(p, alpha)
+        return
+
     # Are the samples large enough to assume normal distribution?
     normal_dist = central_limit_theorem_test(*args, n_clt = n_clt)
     print(f'Samples contain more than {n_clt} observations: {normal_dist}')
@@ -291,4 +523,338 @@ def anova_test(*args, alpha: float = 0.05, n_clt: int = 30) -> None:
         print(f'Using non-parametric test...')
         f, p = stats.kruskal(*args)
 
-    evaluate_hypothesis(p, alpha)
\ No newline at end of file
+    evaluate_hypothesis(p, alpha)
+
+## PERMUTATION TEST FUNCTIONS
+
+def permutation_test(
+    *args,
+    alternative: str = 'two-sided',
+    n_permutations: int = 10_000,
+    alpha: float = 0.05,
+    n_jobs: int = 1,
+    random_seed: int = 24,
+    early_stopping: bool = True
+) -> tuple:
+    '''
+    Given two or more independent samples, conducts a permutation test of the difference in means for two
+    samples, or of the F statistic for three or more, and returns the statistic, p value, and number of
+    permutations used.
+
+    Permutations are drawn in batches as matrices of shuffled group labels, and the group sums of every
+    permutation in a batch come from one matrix product per group. Batches can be spread across processes that each
+    receive the data once. With early stopping, permutations stop once a 99.9% confidence interval for
+    the p value lies entirely above or below alpha.
+
+    Parameters
+    ----------
+    *args : Pandas Series
+        Two or more independent samples.
+
+    alternative : str, default 'two-sided'
+        For two samples, 'two-sided', 'less', or 'greater'. The F test for three or more samples is
+        always one sided.
+
+    n_permutations : int, default 10_000
+        The largest number of permutations.
+
+    alpha : float, default 0.05
+        The alpha value the p value is resolved against when stopping early.
+
+    n_jobs : int, default 1
+        The number of processes used to run the permutations, -1 for all cores.
+
+    random_seed : int, default 24
+        The random seed used to draw the permutations.
+
+    early_stopping : bool, default True
+        Whether to stop once the p value is clearly above or below alpha.
+
+    Returns
+    -------
+    tuple : The observed statistic, the p value, and the number of permutations used.
+
+    Examples
+    --------
+    >>> import stats_util as su
+
+    >>> statistic, p, n = su.permutation_test(sample1, sample2, alternative = 'greater')
+    >>> statistic, p, n = su.permutation_test(sample1, sample2, sample3, n_jobs = 4)
+    '''
+
+    if alternative not in ('two-sided', 'less', 'greater'):
+        raise ValueError(f"alternative must be 'two-sided', 'less', or 'greater', not {alternative!r}")
+
+    values = np.concatenate([np.asarray(arg, dtype = np.float64) for arg in args])
+    values -= values.mean()
+    codes = np.repeat(np.arange(len(args)), [len(arg) for arg in args])
+
+    observed = _permutation_statistic(np.bincount(codes, values)[None, :], values, codes)[0]
+    tolerance = 1e-9 * max(abs(observed), 1e-300)
+
+    # keep each batch's label matrix to roughly 10 million entries
+    batch_size = max(1, min(1_000, 10_000_000 // len(values)))
+    seed_sequence = np.random.SeedSequence(random_seed)
+    n_jobs = n_workers(n_jobs)
+
+    extreme = 0
+    done = 0
+    with worker_pool(n_jobs, values = values, codes = codes) as map_batches:
+        while done < n_permutations:
+            # one batch per worker in each round, so the p value can be checked between rounds
+            sizes, seeds = batch_seeds(min(n_jobs * batch_size, n_permutations - done), batch_size, seed_sequence)
+
+            for statistics in map_batches(_permutation_batch, seeds, sizes):
+                if len(args) > 2 or alternative == 'greater':
+                    extreme += np.count_nonzero(statistics >= observed - tolerance)
+                elif alternative == 'less':
+                    extreme += np.count_nonzero(statistics <= observed + tolerance)
+                else:
+                    extreme += np.count_nonzero(np.abs(statistics) >= abs(observed) - tolerance)
+                done += len(statistics)
+
+            if early_stopping and done < n_permutations:
+                # clopper-pearson interval for the probability of an extreme permutation
+                lower = stats.beta.ppf(0.0005, extreme, done - extreme + 1) if extreme else 0.0
+                upper = stats.beta.ppf(0.9995, extreme + 1, done - extreme)
+                if upper < alpha or lower > alpha:
+                    break
+
+    return observed, (extreme + 1) / (done + 1), done
+
+def _permutation_batch(seed: np.random.SeedSequence, n_permutations: int) -> np.ndarray:
+    '''
+    Shuffle the group labels once for each permutation in a batch and return the statistic of each
+    permutation.
+    '''
+
+    values = worker_data()['values']
+    codes = worker_data()['codes']
+    n_groups = codes[-1] + 1
+
+    labels = permuted_labels(seed, codes, n_permutations)
+
+    # the values are centered, so the last group's sum is minus the sum of the others
+    sums = np.empty((n_permutations, n_groups))
+    for group in range(n_groups - 1):
+        sums[:, group] = (labels == group).astype(np.float64) @ values
+    sums[:, -1] = -sums[:, :-1].sum(axis = 1)
+
+    return _permutation_statistic(sums, values, codes)
+
+def _permutation_statistic(sums: np.ndarray, values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    '''
+    Return the difference in means for two groups, or the F statistic for three or more, from the group
+    sums of centered values for each permutation.
+    '''
+
+    sizes = np.bincount(codes)
+
+    if len(sizes) == 2:
+        return sums[:, 0] / sizes[0] - sums[:, 1] / sizes[1]
+
+    between = (sums ** 2 / sizes).sum(axis = 1)
+    within = values @ values - between
+
+    return (between / (len(sizes) - 1)) / (within / (len(values) - len(sizes)))
+
+## BATCH HYPOTHESIS TEST FUNCTIONS
+
+def run_hypothesis_tests(
+    df: pd.DataFrame,
+    tests: list,
+    alpha: float = 0.05,
+    correction: str = 'fdr_bh',
+    n_clt: int = 30,
+    n_jobs: int = 1
+) -> pd.DataFrame:
+    '''
+    Runs a family of hypothesis tests described by a list of dictionaries, corrects the p values for
+    multiple comparisons, and returns the results as a table with one row per test.
+
+    Each test is a dictionary with a 'test' key and the columns it uses:
+
+        {'test' : 'correlation', 'x' : column, 'y' : column, 'method' : 'pearson' or 'spearman'}
+        {'test' : 'chi2', 'x' : column, 'y' : column}
+        {'test' : 'ttest', 'value' : column, 'group' : column, 'groups' : [level1, level2], 'alternative' : ...}
+        {'test' : 'anova', 'value' : column, 'group' : column, 'groups' : [levels]}
+
+    A t-test on a group column with more than two levels must name two of them in 'groups'.
+
+    'groups' defaults to every level of the group column, and 'name' can be given to label the test. The
+    t-test and ANOVA choose a parametric or non-parametric test the same way as two_sample_ttest and
+    anova_test, or use permutation_test when 'permutation' is True. Permutation tests run a fixed
+    'n_permutations' (default 10_000) without early stopping, since stopping against the unadjusted alpha
+    would bias the p values the correction relies on; use at least m / alpha permutations for m tests so the
+    smallest possible p value can survive the correction. With n_jobs greater than one the tests run on a
+    process pool that receives the columns used by the tests once.
+
+    Parameters
+    ----------
+    df : Pandas DataFrame
+        The dataset the tests are run on.
+
+    tests : list
+        The tests to run, as dictionaries.
+
+    alpha : float, default 0.05
+        The family-wise error rate for 'holm', or the false discovery rate for 'fdr_bh'.
+
+    correction : str, default 'fdr_bh'
+        The multiple comparison correction, 'fdr_bh' for Benjamini-Hochberg, 'holm' for Holm-Bonferroni,
+        or None for no correction.
+
+    n_clt : int, default 30
+        The minimum sample size required to use a parametric test.
+
+    n_jobs : int, default 1
+        The number of processes used to run the tests, -1 for all cores.
+
+    Returns
+    -------
+    DataFrame : The name, test, method, statistic, p, adjusted p, number of observations, and whether the
+        null hypothesis is rejected after the correction for each test.
+
+    Examples
+    --------
+    >>> import stats_util as su
+
+    >>> su.run_hypothesis_tests(train, [
+    ...     {'test' : 'correlation', 'x' : 'square_feet', 'y' : 'property_tax_assessed_values'},
+    ...     {'test' : 'chi2', 'x' : 'fips', 'y' : 'bedroom_count'},
+    ...     {'test' : 'ttest', 'value' : 'property_tax_assessed_values', 'group' : 'fips', 'groups' : [6037, 6059]},
+    ...     {'test' : 'anova', 'value' : 'property_tax_assessed_values', 'group' : 'bedroom_count'}
+    ... ], correction = 'holm', n_jobs = 4)
+    '''
+
+    if correction not in ('fdr_bh', 'holm', None):
+        raise ValueError(f"correction must be 'fdr_bh', 'holm', or None, not {correction!r}")
+
+    for test in tests:
+        if test['test'] not in _hypothesis_tests:
+            raise ValueError(f"Unknown test {test['test']!r}, expected one of {list(_hypothesis_tests)}")
+
+    # only the columns the tests use are sent to the workers
+    columns = list(dict.fromkeys(test[key] for test in tests for key in ('x', 'y', 'value', 'group') if key in test))
+    items = [{**test, 'alpha' : alpha, 'n_clt' : n_clt} for test in tests]
+
+    n_jobs = n_workers(n_jobs)
+    with worker_pool(n_jobs, df = df[columns]) as map_tests:
+        results = list(map_tests(_run_hypothesis, items, chunksize = max(1, len(items) // (4 * n_jobs))))
+
+    results = pd.DataFrame(results, columns = ['name', 'test', 'method', 'statistic', 'p', 'n'])
+    results['p_adjusted'] = adjust_p_values(results.p, correction)
+    results['reject'] = results.p_adjusted < alpha
+
+    return results
+
+def adjust_p_values(p, method: str = 'fdr_bh') -> np.ndarray:
+    '''
+    Adjusts a family of p values for multiple comparisons with the Benjamini-Hochberg ('fdr_bh') or
+    Holm-Bonferroni ('holm') procedure. Rejecting the adjusted p values below alpha controls the false
+    discovery rate or the family-wise error rate at alpha. A method of None returns the p values.
+    '''
+
+    p = np.asarray(p, dtype = np.float64)
+    if method is None or not len(p):
+        return p
+
+    m = len(p)
+    order = np.argsort(p)
+    ranks = np.arange(1, m + 1)
+
+    if method == 'fdr_bh':
+        adjusted = np.minimum.accumulate((p[order] * m / ranks)[::-1])[::-1]
+    elif method == 'holm':
+        adjusted = np.maximum.accumulate(p[order] * (m - ranks + 1))
+    else:
+        raise ValueError(f"method must be 'fdr_bh', 'holm', or None, not {method!r}")
+
+    result = np.empty(m)
+    result[order] = np.minimum(adjusted, 1)
+
+    return result
+
+def _run_hypothesis(test: dict) -> tuple:
+    '''
+    Run one test and return its name, test, method, statistic, p value, and number of observations.
+    '''
+
+    method, statistic, p, n = _hypothesis_tests[test['test']](worker_data()['df'], test)
+    name = test.get('name', ' '.join(str(test[key]) for key in ('x', 'y', 'value', 'group', 'groups') if key in test))
+
+    return name, test['test'], method, float(statistic), float(p), int(n)
+
+def _correlation_hypothesis(df: pd.DataFrame, test: dict) -> tuple:
+    method = test.get('method', 'pearson')
+    result = correlation_matrix(df, test['y'], [test['x']], method)
+
+    return method, result.r[0], result.p[0], result.n[0]
+
+def _chi2_hypothesis(df: pd.DataFrame, test: dict) -> tuple:
+    result = chi2_tests(df, pairs = [(test['x'], test['y'])])
+
+    return 'chi2', result.chi2[0], result.p[0], result.n[0]
+
+def _group_samples(df: pd.DataFrame, test: dict) -> list:
+    '''
+    Split the value column by the levels of the group column, in the order given by the test.
+    '''
+
+    data = df[[test['value'], test['group']]].dropna()
+    groups = test.get('groups', sorted(data[test['group']].unique()))
+    samples = dict(tuple(data.groupby(test['group'])[test['value']]))
+
+    return [samples[group] for group in groups]
+
+def _ttest_hypothesis(df: pd.DataFrame, test: dict) -> tuple:
+    samples = _group_samples(df, test)
+    if len(samples) != 2:
+        raise ValueError(
+            f"A t-test needs exactly 2 groups, but {test['group']!r} has {len(samples)}. "
+            "Choose two levels with 'groups' or use an 'anova' test."
+        )
+
+    sample1, sample2 = samples
+    alternative = test.get('alternative', 'two-sided')
+    n = sample1.size + sample2.size
+
+    if test.get('permutation', False):
+        statistic, p, _ = permutation_test(
+            sample1, sample2,
+            alternative = alternative,
+            n_permutations = test.get('n_permutations', 10_000),
+            early_stopping = False
+        )
+        return 'permutation', statistic, p, n
+
+    if central_limit_theorem_test(sample1, sample2, n_clt = test['n_clt']):
+        equal_var = equal_var_test(sample1, sample2, alpha = test['alpha'])
+        statistic, p = stats.ttest_ind(sample1, sample2, equal_var = equal_var, alternative = alternative)
+        return 'ttest_ind' if equal_var else 'welch', statistic, p, n
+
+    statistic, p = stats.mannwhitneyu(sample1, sample2, alternative = alternative)
+    return 'mannwhitneyu', statistic, p, n
+
+def _anova_hypothesis(df: pd.DataFrame, test: dict) -> tuple:
+    samples = _group_samples(df, test)
+    n = sum(sample.size for sample in samples)
+
+    if test.get('permutation', False):
+        statistic, p, _ = permutation_test(*samples, n_permutations = test.get('n_permutations', 10_000), early_stopping = False)
+        return 'permutation', statistic, p, n
+
+    if central_limit_theorem_test(*samples, n_clt = test['n_clt']):
+        equal_var = equal_var_test(*samples, alpha = test['alpha'])
+        statistic, p = stats.f_oneway(*samples, equal_var = equal_var)
+        return 'f_oneway' if equal_var else 'welch_anova', statistic, p, n
+
+    statistic, p = stats.kruskal(*samples)
+    return 'kruskal', statistic, p, n
+
+_hypothesis_tests = {
+    'correlation' : _correlation_hypothesis,
+    'chi2' : _chi2_hypothesis,
+    'ttest' : _ttest_hypothesis,
+    'anova' : _anova_hypothesis
+}
\ No newline at end of file